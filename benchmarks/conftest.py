@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from nfmer.api.settings import get_settings
+from nfmer.db_handler import DatabaseHandler
+from utils.synthetic_data import populate
+
+
+@pytest.fixture(scope="session")
+def corpus_size() -> int:
+    """Number of generated events, e.g. ``NFMER_BENCH_EVENTS=1000000`` for the large run"""
+    return int(os.environ.get("NFMER_BENCH_EVENTS", 10_000))
+
+
+@pytest.fixture(scope="session")
+def bench_db_path(tmp_path_factory: pytest.TempPathFactory, corpus_size: int) -> Path:
+    db_path = tmp_path_factory.mktemp("benchmarks") / "events.db"
+    populate(DatabaseHandler(f"sqlite:///{db_path}"), corpus_size)
+    return db_path
+
+
+@pytest.fixture(scope="session")
+def bench_db(bench_db_path: Path) -> DatabaseHandler:
+    return DatabaseHandler(f"sqlite:///{bench_db_path}")
+
+
+@pytest.fixture(scope="session")
+def bench_client(bench_db_path: Path) -> Iterator[TestClient]:
+    from nfmer.api.v1.api import api
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("NFMER_DB_URL", f"sqlite:///{bench_db_path}")
+        get_settings.cache_clear()
+        with TestClient(api) as client:
+            yield client
+    get_settings.cache_clear()
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from typing import Any, Callable
+
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.export import ExportFormat, ExportTable
+from utils.synthetic_data import CorpusShape, composer_name, generate_events
+
+SHAPE = CorpusShape()
+MIDDLE = SHAPE.start + timedelta(days=3000)  # inside the default 10k-event corpus, which spans ~18 years
+
+# every public DatabaseHandler method, called like the scraper and the API call it;
+# the most popular composer and composition (ids 1, seen first) are the most expensive ones to read
+QUERY_METHODS: dict[str, Callable[[DatabaseHandler], Any]] = {
+    "warm_identity_cache": lambda db: db.warm_identity_cache(),
+    # saving event 1 again marks its compositions stale, among them some of the most popular ones
+    "refresh_read_models": lambda db: (db.save_event_data(dict(generate_events(1, SHAPE))), db.refresh_read_models()),
+    "save_backfill_progress": lambda db: db.save_backfill_progress([1, 2, 3], [4], {5: "error"}),
+    "get_backfill_ranges": lambda db: db.get_backfill_ranges(),
+    "get_backfill_failures": lambda db: db.get_backfill_failures(),
+    "get_event_hashes": lambda db: db.get_event_hashes(),
+    "get_data_version": lambda db: db.get_data_version(),
+    "restore_listed_events": lambda db: db.restore_listed_events([str(event_id) for event_id in range(1, 1000)]),
+    # nothing is after 9999-01-01, so this finds what to tombstone without changing the corpus
+    "tombstone_missing_events": lambda db: db.tombstone_missing_events(["1"], today=date(9999, 1, 1)),
+    "export": lambda db: list(db.export(ExportTable.EVENTS, ExportFormat.CSV)),
+    "get_all_events": lambda db: db.get_all_events(limit=100, after="500"),
+    "get_event_by_id": lambda db: db.get_event_by_id("500"),
+    "get_events_between": lambda db: db.get_events_between(MIDDLE, MIDDLE + timedelta(days=365), limit=100),
+    "get_upcoming_events": lambda db: db.get_upcoming_events(10, composer_id=1, today=MIDDLE),
+    "get_all_compositions": lambda db: db.get_all_compositions(limit=100, after=100),
+    "search_compositions_by_name": lambda db: db.search_compositions_by_name("symphony no. 2"),
+    "get_composition_by_id": lambda db: db.get_composition_by_id(1),
+    "get_composition_detail": lambda db: db.get_composition_detail(1),
+    "get_all_composers": lambda db: db.get_all_composers(limit=100, after=100),
+    "search_composers_by_name": lambda db: db.search_composers_by_name(composer_name(1).split()[-1]),
+    "get_composer_by_id": lambda db: db.get_composer_by_id(1),
+    "get_composer_detail": lambda db: db.get_composer_detail(1),
+    "get_compositions_by_event": lambda db: db.get_compositions_by_event("500"),
+    "get_compositions_by_composer": lambda db: db.get_compositions_by_composer(composer_name(1)),
+}
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from nfmer.api.v1.response_cache import response_cache
+from utils.synthetic_data import composer_name
+
+pytestmark = pytest.mark.benchmark(group="api")
+
+ENDPOINTS = [
+    "/events/?limit=100&after=500",
+    "/events/500",
+    "/events/upcoming",
+    "/events/calendar?start=2008-01-01&end=2008-12-31&limit=100",
+    "/events/calendar?start=2008-01-01&composer_id=1&limit=100",
+    "/composers/?limit=100&after=100",
+    "/composers/1",
+    "/compositions/?limit=100&after=100",
+    "/compositions/1",
+    "/export/events?format=csv",
+    "/",
+    f"/search/?q={composer_name(1).split()[-1]}",
+    "/composers/1/",
+    "/compositions/1/",
+]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_endpoint(benchmark: BenchmarkFixture, bench_client: TestClient, path: str) -> None:
+    """A response cache miss, i.e. what the first request after a scrape costs"""
+
+    def get() -> None:
+        assert bench_client.get(path).status_code == 200
+
+    benchmark.pedantic(get, setup=response_cache.clear, rounds=50, warmup_rounds=1)  # type: ignore [no-untyped-call]
+
+
+@pytest.mark.parametrize("path", ["/composers/1", "/composers/1/"])
+def test_cached_endpoint(benchmark: BenchmarkFixture, bench_client: TestClient, path: str) -> None:
+    def get() -> None:
+        assert bench_client.get(path).status_code == 200
+
+    benchmark(get)
@@ -0,0 +1,30 @@
+from itertools import count
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.query_methods import QUERY_METHODS, SHAPE
+from nfmer.db_handler import DatabaseHandler
+from nfmer.models import NFM_Event
+from utils.synthetic_data import generate_events
+
+pytestmark = pytest.mark.benchmark(group="db")
+
+
+@pytest.mark.parametrize("method", QUERY_METHODS)
+def test_query(benchmark: BenchmarkFixture, bench_db: DatabaseHandler, method: str) -> None:
+    benchmark(QUERY_METHODS[method], bench_db)
+
+
+def test_save_event_data(benchmark: BenchmarkFixture, bench_db: DatabaseHandler, corpus_size: int) -> None:
+    """A scraper batch of 100 new events, added to the full corpus"""
+    first_ids = count(corpus_size + 1, 100)
+
+    def next_batch() -> tuple[tuple[dict[str, NFM_Event]], dict[str, Any]]:
+        first_id = next(first_ids)
+        return (dict(generate_events(100, SHAPE, seed=first_id, first_id=first_id)),), {}
+
+    benchmark.pedantic(  # type: ignore [no-untyped-call]
+        bench_db.save_event_data, setup=next_batch, rounds=20, warmup_rounds=1
+    )
@@ -0,0 +1,20 @@
+import os
+from dataclasses import dataclass
+from functools import cache
+
+
+@dataclass(frozen=True)
+class Settings:
+    db_url: str = "sqlite:///events.db"
+    db_pool_size: int = 5
+    template_cache_dir: str | None = None  # None: a per-user directory in the system temp dir
+
+
+@cache
+def get_settings() -> Settings:
+    """Settings from the ``NFMER_*`` environment variables, read once per process"""
+    return Settings(
+        db_url=os.environ.get("NFMER_DB_URL", Settings.db_url),
+        db_pool_size=int(os.environ.get("NFMER_DB_POOL_SIZE", Settings.db_pool_size)),
+        template_cache_dir=os.environ.get("NFMER_TEMPLATE_CACHE_DIR", Settings.template_cache_dir),
+    )
@@ -1,18 +1,34 @@
-import uvicorn
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
 
+import uvicorn
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
-from nfmer.api.v1.routers import composers, compositions, events, pages
+from nfmer.api.settings import get_settings
+from nfmer.api.v1.routers import composers, compositions, events, export, pages
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
 
 STATIC_DIR = Path(__file__).parent.parent / "static"
 
-api = FastAPI(title="NFMer API", version="v1")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Opens the database once per process, shared by all requests"""
+    settings = get_settings()
+    app.state.db = AsyncDatabaseHandler(settings.db_url, pool_size=settings.db_pool_size)
+    await app.state.db.create_schema()
+    yield
+    await app.state.db.dispose()
+
+
+api = FastAPI(title="NFMer API", version="v1", lifespan=lifespan)
 
 api.include_router(events.router)
 api.include_router(compositions.router)
 api.include_router(composers.router)
+api.include_router(export.router)
 api.include_router(pages.router)
 
 api.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
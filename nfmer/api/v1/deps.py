@@ -0,0 +1,9 @@
+from fastapi import Request
+
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+
+
+def get_async_db(request: Request) -> AsyncDatabaseHandler:
+    """The process-wide handler created by the API lifespan"""
+    db: AsyncDatabaseHandler = request.app.state.db
+    return db
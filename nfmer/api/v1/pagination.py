@@ -0,0 +1,26 @@
+from typing import Callable, TypeVar
+
+from fastapi import Query, Request, Response
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="maximum number of items on the page")
+
+
+def paginate(
+    items: list[T], limit: int, request: Request, response: Response, cursor: Callable[[T], str | int]
+) -> list[T]:
+    """Cuts a page out of ``limit + 1`` fetched items and, if there's more, links the next page.
+
+    The link goes into a ``Link: <...>; rel="next"`` header, so the body stays a plain list;
+    its ``after`` parameter is the cursor (key) of the last item on this page.
+    """
+    if len(items) <= limit:
+        return items
+    page = items[:limit]
+    next_url = request.url.include_query_params(limit=limit, after=cursor(page[-1]))
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return page
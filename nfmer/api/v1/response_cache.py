@@ -0,0 +1,102 @@
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+CacheKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+    media_type: str
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+class ResponseCache:
+    """In-process LRU cache of rendered response bodies, keyed by URL and query parameters.
+
+    Entries are only valid for the data version they were rendered from: when the scraper
+    writes new data the version changes and the whole cache is dropped. The ETag is a hash
+    of the body, so clients revalidating after a scrape still get a 304 if their resource
+    didn't change.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.data_version: int | None = None
+        self._entries: OrderedDict[CacheKey, CachedBody] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.data_version = None
+
+    def _get(self, key: CacheKey, data_version: int) -> CachedBody | None:
+        if data_version != self.data_version:
+            self._entries.clear()
+            self.data_version = data_version
+        cached = self._entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cached
+
+    def _put(self, key: CacheKey, cached: CachedBody) -> None:
+        self._entries[key] = cached
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def respond(
+        self,
+        request: Request,
+        data_version: int,
+        render: Callable[[], Awaitable[bytes | Response]],
+        media_type: str = "application/json",
+    ) -> Response:
+        """Serves the cached body of the request (or a 304), rendering and caching it on a miss.
+
+        ``render`` may raise ``HTTPException`` or return a ready ``Response`` (e.g. an error page),
+        neither is cached. The base URL is part of the key, since pages link with absolute URLs.
+        """
+        key = (str(request.base_url), request.url.path, tuple(sorted(request.query_params.multi_items())))
+        cached = self._get(key, data_version)
+        if cached is None:
+            body = await render()
+            if isinstance(body, Response):
+                return body
+            cached = CachedBody(body, strong_etag(body), media_type)
+            self._put(key, cached)
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}  # may be stored, but has to be revalidated
+        if etag_matches(request, cached.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+
+response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    return response_cache
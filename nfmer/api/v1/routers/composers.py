@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
 
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Composer, ComposerPublic, ComposerPublicFull
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import TypeAdapter
+
+from nfmer.api.v1.deps import get_async_db
+from nfmer.api.v1.pagination import PageLimit, paginate
+from nfmer.api.v1.response_cache import ResponseCache, get_response_cache
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Composer, ComposerDetail, ComposerPublic
 
 router = APIRouter(prefix="/composers", tags=["composers"])
 
+composer_list = TypeAdapter(list[ComposerPublic])
+
 
 @router.get("/", response_model=list[ComposerPublic])
-def get_composers(search: str = "", db: DatabaseHandler = Depends(get_db)) -> list[Composer]:
+async def get_composers(
+    request: Request,
+    response: Response,
+    search: str = "",
+    limit: int = PageLimit,
+    after: Optional[int] = None,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+) -> list[Composer] | Response:
     if search:
-        return db.search_composers_by_name(search)
+
+        async def render() -> bytes:
+            composers = await db.search_composers_by_name(search)
+            return composer_list.dump_json(composer_list.validate_python(composers, from_attributes=True))
+
+        return await cache.respond(request, await db.get_data_version(), render)
     else:
-        return db.get_all_composers()
+        composers = await db.get_all_composers(limit + 1, after)
+        return paginate(composers, limit, request, response, cursor=lambda composer: composer.id or 0)
+
 
+@router.get("/{composer_id}", response_model=ComposerDetail)
+async def get_composer(
+    composer_id: int,
+    request: Request,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    async def render() -> bytes:
+        composer = await db.get_composer_detail(composer_id)
+        if not composer:
+            raise HTTPException(status_code=404, detail="Composer not found")
+        return composer.encode()
 
-@router.get("/{composer_id}", response_model=ComposerPublicFull)
-def get_composer(composer_id: int, db: DatabaseHandler = Depends(get_db)) -> Composer:
-    composer = db.get_composer_by_id(composer_id)
-    if not composer:
-        raise HTTPException(status_code=404, detail="Composer not found")
-    return composer
+    return await cache.respond(request, await db.get_data_version(), render)
@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
 
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Composition, CompositionPublic, CompositionPublicFull
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import TypeAdapter
+
+from nfmer.api.v1.deps import get_async_db
+from nfmer.api.v1.pagination import PageLimit, paginate
+from nfmer.api.v1.response_cache import ResponseCache, get_response_cache
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Composition, CompositionDetail, CompositionPublic
 
 router = APIRouter(prefix="/compositions", tags=["compositions"])
 
+composition_list = TypeAdapter(list[CompositionPublic])
+
 
 @router.get("/", response_model=list[CompositionPublic])
-def get_compositions(search: str = "", db: DatabaseHandler = Depends(get_db)) -> list[Composition]:
+async def get_compositions(
+    request: Request,
+    response: Response,
+    search: str = "",
+    limit: int = PageLimit,
+    after: Optional[int] = None,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+) -> list[Composition] | Response:
     if search:
-        return db.search_compositions_by_name(search)
+
+        async def render() -> bytes:
+            compositions = await db.search_compositions_by_name(search)
+            return composition_list.dump_json(composition_list.validate_python(compositions, from_attributes=True))
+
+        return await cache.respond(request, await db.get_data_version(), render)
     else:
-        return db.get_all_compositions()
+        compositions = await db.get_all_compositions(limit + 1, after)
+        return paginate(compositions, limit, request, response, cursor=lambda composition: composition.id or 0)
+
 
+@router.get("/{composition_id}", response_model=CompositionDetail)
+async def get_composition(
+    composition_id: int,
+    request: Request,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    async def render() -> bytes:
+        composition = await db.get_composition_detail(composition_id)
+        if not composition:
+            raise HTTPException(status_code=404, detail="Composition not found")
+        return composition.encode()
 
-@router.get("/{composition_id}", response_model=CompositionPublicFull)
-def get_composition(composition_id: int, db: DatabaseHandler = Depends(get_db)) -> Composition:
-    composition = db.get_composition_by_id(composition_id)
-    if not composition:
-        raise HTTPException(status_code=404, detail="Composition not found")
-    return composition
+    return await cache.respond(request, await db.get_data_version(), render)
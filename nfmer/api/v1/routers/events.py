@@ -1,19 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
 
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Event, EventPublic
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from nfmer.api.v1.deps import get_async_db
+from nfmer.api.v1.pagination import MAX_PAGE_SIZE, PageLimit, paginate
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Event, EventPublicFull
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+ComposerFilter = Query(None, description="only events with a composition by this composer")
+CompositionFilter = Query(None, description="only events with this composition on the programme")
+LocationFilter = Query(None, description="only events at this location")
+
 
 @router.get("/", response_model=list[str])
-def get_events(db: DatabaseHandler = Depends(get_db)) -> list[str]:
-    return db.get_all_events()
+async def get_events(
+    request: Request,
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+) -> list[str]:
+    event_ids = await db.get_all_events(limit + 1, after)
+    return paginate(event_ids, limit, request, response, cursor=lambda event_id: event_id)
+
+
+@router.get("/upcoming", response_model=list[EventPublicFull])
+async def get_upcoming_events(
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE, description="number of events"),
+    composer_id: Optional[int] = ComposerFilter,
+    composition_id: Optional[int] = CompositionFilter,
+    location: Optional[str] = LocationFilter,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+) -> list[Event]:
+    """The next events from today on, with their programmes"""
+    return await db.get_upcoming_events(
+        limit, composer_id=composer_id, composition_id=composition_id, location=location
+    )
+
+
+@router.get("/calendar", response_model=list[EventPublicFull])
+async def get_calendar(
+    request: Request,
+    response: Response,
+    start: date,
+    end: Optional[date] = None,
+    composer_id: Optional[int] = ComposerFilter,
+    composition_id: Optional[int] = CompositionFilter,
+    location: Optional[str] = LocationFilter,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+) -> list[Event]:
+    """Events from ``start`` to ``end`` (both inclusive) with their programmes, in the order they take place"""
+    if end is not None and end < start:
+        raise HTTPException(status_code=422, detail="end is before start")
+    events = await db.get_events_between(
+        start,
+        end,
+        composer_id=composer_id,
+        composition_id=composition_id,
+        location=location,
+        limit=limit + 1,
+        after=after,
+    )
+    return paginate(events, limit, request, response, cursor=lambda event: event.id)
 
 
-@router.get("/{event_id}", response_model=EventPublic)
-def get_event(event_id: str, db: DatabaseHandler = Depends(get_db)) -> Event:
-    event = db.get_event_by_id(event_id)
+@router.get("/{event_id}", response_model=EventPublicFull)
+async def get_event(event_id: str, db: AsyncDatabaseHandler = Depends(get_async_db)) -> Event:
+    event = await db.get_event_by_id(event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.db_handler.export import ExportFormat, ExportTable
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+@router.get("/{table}", response_class=StreamingResponse)
+async def export_table(
+    table: ExportTable,
+    format: ExportFormat = ExportFormat.NDJSON,
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+) -> StreamingResponse:
+    """Streams a whole table (events, composers, compositions or the event-composition links)"""
+    return StreamingResponse(
+        db.export(table, format),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table.value}.{format.value}"'},
+    )
@@ -1,73 +1,97 @@
-from fastapi import APIRouter, Depends, Request
+from typing import Any
+
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
-from nfmer.db_handler import DatabaseHandler, get_db
+from nfmer.api.settings import get_settings
+from nfmer.api.v1.deps import get_async_db
+from nfmer.api.v1.response_cache import ResponseCache, get_response_cache
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import ComposerDetail, CompositionDetail
 
 router = APIRouter(tags=["pages"])
-templates = Jinja2Templates(directory="nfmer/api/templates")
+# compiled templates are kept on disk, so new workers don't have to compile them again
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader("nfmer/api/templates"),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(get_settings().template_cache_dir),
+    )
+)
+
+
+def render_template(request: Request, name: str, context: dict[str, Any]) -> bytes:
+    return templates.get_template(name).render(request=request, **context).encode()
 
 
 @router.get("/", response_class=HTMLResponse, name="index")
-def index(request: Request):
+async def index(request: Request):
     return templates.TemplateResponse(request, "index.html")
 
 
 @router.get("/search/", response_class=HTMLResponse, name="search_results")
-def search_results(
+async def search_results(
     request: Request,
     q: str = "",
     type: str = "composers",
-    db: DatabaseHandler = Depends(get_db),
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
 ):
-    if type == "composers":
-        results = db.search_composers_by_name(q) if q else []
-    else:
-        results = db.search_compositions_by_name(q) if q else []
-    return templates.TemplateResponse(
-        request,
-        "partials/search_results.html",
-        {"results": results, "search_type": type, "query": q},
-    )
+    async def render() -> bytes:
+        if type == "composers":
+            results = await db.search_composers_by_name(q) if q else []
+        else:
+            results = await db.search_compositions_by_name(q) if q else []
+        return render_template(
+            request,
+            "partials/search_results.html",
+            {"results": results, "search_type": type, "query": q},
+        )
+
+    return await cache.respond(request, await db.get_data_version(), render, media_type="text/html")
 
 
 @router.get("/composers/{composer_id}/", response_class=HTMLResponse, name="composer_detail")
-def composer_detail(
+async def composer_detail(
     request: Request,
     composer_id: int,
-    db: DatabaseHandler = Depends(get_db),
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
 ):
-    composer = db.get_composer_by_id(composer_id)
-    if not composer:
-        return templates.TemplateResponse(
-            request,
-            "error.html",
-            {"message": "Composer not found"},
-            status_code=404,
-        )
-    return templates.TemplateResponse(
-        request,
-        "composer_detail.html",
-        {"composer": composer},
-    )
+    async def render() -> bytes | Response:
+        payload = await db.get_composer_detail(composer_id)
+        if not payload:
+            return templates.TemplateResponse(
+                request,
+                "error.html",
+                {"message": "Composer not found"},
+                status_code=404,
+            )
+        composer = ComposerDetail.model_validate_json(payload)
+        return render_template(request, "composer_detail.html", {"composer": composer})
+
+    return await cache.respond(request, await db.get_data_version(), render, media_type="text/html")
 
 
 @router.get("/compositions/{composition_id}/", response_class=HTMLResponse, name="composition_detail")
-def composition_detail(
+async def composition_detail(
     request: Request,
     composition_id: int,
-    db: DatabaseHandler = Depends(get_db),
+    db: AsyncDatabaseHandler = Depends(get_async_db),
+    cache: ResponseCache = Depends(get_response_cache),
 ):
-    composition = db.get_composition_by_id(composition_id)
-    if not composition:
-        return templates.TemplateResponse(
-            request,
-            "error.html",
-            {"message": "Composition not found"},
-            status_code=404,
-        )
-    return templates.TemplateResponse(
-        request,
-        "composition_detail.html",
-        {"composition": composition},
-    )
+    async def render() -> bytes | Response:
+        payload = await db.get_composition_detail(composition_id)
+        if not payload:
+            return templates.TemplateResponse(
+                request,
+                "error.html",
+                {"message": "Composition not found"},
+                status_code=404,
+            )
+        composition = CompositionDetail.model_validate_json(payload)
+        return render_template(request, "composition_detail.html", {"composition": composition})
+
+    return await cache.respond(request, await db.get_data_version(), render, media_type="text/html")
@@ -1,183 +1,469 @@
-from typing import Dict, Generator, Optional, cast
+import json
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Iterator, Optional
 
-from sqlalchemy.orm import selectinload
-from sqlmodel import Column, Session, SQLModel, create_engine, select
+from sqlalchemy import Connection, delete, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, col, create_engine, select, update
 
+from nfmer.db_handler import queries
+from nfmer.db_handler.batching import chunked
+from nfmer.db_handler.export import (
+    EXPORT_CHUNK_SIZE,
+    ExportFormat,
+    ExportTable,
+    export_columns,
+    export_query,
+    format_header,
+    format_rows,
+)
+from nfmer.db_handler.identity_cache import DEFAULT_MAX_SIZE, IdentityCache
+from nfmer.db_handler.normalize import normalize_name
+from nfmer.db_handler.profile import SQLiteProfile, apply_profile
+from nfmer.db_handler.read_models import mark_stale, refresh_stale_read_models
+from nfmer.db_handler.schema import migrate
 from nfmer.models import (
+    BackfillFailure,
+    BackfillRange,
     Composer,
     Composition,
+    DataVersion,
     Event,
     EventCompositionLink,
     NFM_Event,
 )
 
 
+def to_ranges(ids: Iterable[int]) -> list[tuple[int, int]]:
+    """Collapses ids into sorted, inclusive ``(start, end)`` ranges of consecutive ids"""
+    ranges: list[tuple[int, int]] = []
+    for current_id in sorted(set(ids)):
+        if ranges and ranges[-1][1] == current_id - 1:
+            ranges[-1] = (ranges[-1][0], current_id)
+        else:
+            ranges.append((current_id, current_id))
+    return ranges
+
+
+@dataclass
+class SaveStats:
+    events: int = 0
+    composers_created: int = 0
+    compositions_created: int = 0
+    links: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.events + self.composers_created + self.compositions_created + self.links
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
 class DatabaseHandler:
-    def __init__(self, db_path: str = "sqlite:///events.db"):
+    def __init__(
+        self,
+        db_path: str = "sqlite:///events.db",
+        identity_cache_size: int = DEFAULT_MAX_SIZE,
+        profile: SQLiteProfile = SQLiteProfile(),
+    ):
         self.engine = create_engine(db_path)
-        SQLModel.metadata.create_all(self.engine)
+        apply_profile(self.engine, profile)
+        with self.engine.begin() as connection:
+            migrate(connection)
+        # normalized name -> id caches of composers and compositions, shared by all save_event_data calls
+        self.composer_ids: IdentityCache[str] = IdentityCache(identity_cache_size)
+        self.composition_ids: IdentityCache[tuple[int, str]] = IdentityCache(identity_cache_size)
+        self._identity_cache_warm = False
 
-    def _handle_event_table(self, session: Session, event_id: str, event_data: NFM_Event) -> Event:
-        event = session.get(Event, event_id)
-        if event:
-            event = self._update_event(event, event_data)
-        else:
-            event = self._create_event(event_id, event_data)
-            session.add(event)
-        return event
-
-    def _update_event(self, event: Event, event_data: NFM_Event) -> Event:
-        event.location = event_data.location
-        event.date = event_data.date
-        event.hour = event_data.hour
-        event.url = event_data.url
-        return event
-
-    def _create_event(self, event_id: str, event_data: NFM_Event) -> Event:
-        return Event(
-            id=event_id,
-            location=event_data.location,
-            date=event_data.date,
-            hour=event_data.hour,
-            url=event_data.url,
+    def warm_identity_cache(self) -> None:
+        """Loads known composer and composition ids (up to the cache size) in two queries"""
+        with self.engine.connect() as connection:
+            composers = connection.execute(
+                select(Composer.normalized_name, func.min(Composer.id))
+                .group_by(Composer.normalized_name)
+                .limit(self.composer_ids.max_size)
+            )
+            self.composer_ids.update({name: composer_id for name, composer_id in composers})
+            compositions = connection.execute(
+                select(Composition.composer_id, Composition.normalized_name, func.min(Composition.id))
+                .group_by(col(Composition.composer_id), col(Composition.normalized_name))
+                .limit(self.composition_ids.max_size)
+            )
+            self.composition_ids.update(
+                {(composer_id, name): composition_id for composer_id, name, composition_id in compositions}
+            )
+        self._identity_cache_warm = True
+
+    def _upsert_events(self, connection: Connection, parsed_results: Dict[str, NFM_Event]) -> None:
+        rows = [
+            {
+                "id": event_id,
+                "location": event_data.location,
+                "date": event_data.date,
+                "hour": event_data.hour,
+                "url": event_data.url,
+                "content_hash": event_data.content_hash or None,
+                "tombstoned": False,
+            }
+            for event_id, event_data in parsed_results.items()
+        ]
+        statement = sqlite_insert(Event)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Event.id],
+            set_={name: statement.excluded[name] for name in rows[0] if name != "id"},
         )
+        connection.execute(statement, rows)
+
+    def _clear_event_compositions(self, connection: Connection, event_ids: list[str]) -> set[int]:
+        """Unlinks the events from their compositions, returns the ids of those compositions"""
+        composition_ids: set[int] = set()
+        for event_ids_chunk in chunked(event_ids):
+            links = connection.execute(
+                delete(EventCompositionLink)
+                .where(col(EventCompositionLink.event_id).in_(event_ids_chunk))
+                .returning(col(EventCompositionLink.composition_id))
+            )
+            composition_ids.update(links.scalars())
+        return composition_ids
+
+    def _resolve_composers(
+        self, connection: Connection, composer_names: dict[str, str], stats: SaveStats
+    ) -> dict[str, int]:
+        """Maps normalized composer names to ids, creating the missing composers (named after the dict values)"""
+
+        def lookup(keys: list[str]) -> dict[str, int]:
+            found: dict[str, int] = {}
+            for keys_chunk in chunked(keys):
+                rows = connection.execute(
+                    select(Composer.normalized_name, func.min(Composer.id))
+                    .where(col(Composer.normalized_name).in_(keys_chunk))
+                    .group_by(Composer.normalized_name)
+                )
+                found.update({key: composer_id for key, composer_id in rows})
+            return found
+
+        composer_ids, unknown_keys = self.composer_ids.split(composer_names)
+        composer_ids.update(lookup(sorted(unknown_keys)))
+        missing = sorted(composer_names.keys() - composer_ids.keys())
+        if missing:
+            connection.execute(
+                insert(Composer), [{"composer_name": composer_names[key], "normalized_name": key} for key in missing]
+            )
+            composer_ids.update(lookup(missing))
+            stats.composers_created += len(missing)
+        return composer_ids
 
-    def _handle_composer_table(self, session: Session, composer_name: str) -> Composer:
-        composer = session.exec(select(Composer).where(Composer.composer_name == composer_name)).first()
-        if not composer:
-            composer = Composer(composer_name=composer_name)
-            session.add(composer)
-            session.flush()  # Required get the composer.id in the middle of the transaction
-        return composer
-
-    def _handle_composition_table(self, session: Session, composition_name: str, composer: Composer) -> Composition:
-        composition = session.exec(
-            select(Composition)
-            .where(Composition.composition_name == composition_name)
-            .where(Composition.composer_id == composer.id)
-        ).first()
-        if not composition:
-            composition = Composition(composition_name=composition_name, composer=composer)
-            session.add(composition)
-        return composition
-
-    def _clear_event_compositions(self, session: Session, event_id: str) -> None:
-        statement = select(EventCompositionLink).where(EventCompositionLink.event_id == event_id)
-        event_composition_links = session.exec(statement).all()
-        for link in event_composition_links:
-            session.delete(link)
-
-    def save_event_data(self, parsed_results: Dict[str, NFM_Event]) -> None:
-        with Session(self.engine) as session:
-            for event_id, event_data in parsed_results.items():
-                event = self._handle_event_table(session, event_id, event_data)
-                self._clear_event_compositions(session, event_id)
-                session.flush()  # Ensure deletions are processed before adding new links
-
-                if event_data.event_programme:
-                    for (
-                        composer_name,
-                        composition_name,
-                    ) in event_data.event_programme.items():
-                        composer = self._handle_composer_table(session, composer_name)
-                        composition = self._handle_composition_table(session, composition_name, composer)
-                        event.compositions.append(composition)
+    def _resolve_compositions(
+        self, connection: Connection, compositions: dict[tuple[int, str], str], stats: SaveStats
+    ) -> dict[tuple[int, str], int]:
+        """Maps (composer id, normalized composition name) to ids, creating the missing compositions"""
+
+        def lookup(keys: list[tuple[int, str]]) -> dict[tuple[int, str], int]:
+            found: dict[tuple[int, str], int] = {}
+            for keys_chunk in chunked(keys):
+                rows = connection.execute(
+                    select(Composition.composer_id, Composition.normalized_name, func.min(Composition.id))
+                    .where(col(Composition.composer_id).in_({composer_id for composer_id, _ in keys_chunk}))
+                    .where(col(Composition.normalized_name).in_({name for _, name in keys_chunk}))
+                    .group_by(col(Composition.composer_id), col(Composition.normalized_name))
+                )
+                # the two IN filters select a superset of the requested (composer, name) pairs
+                found.update({(composer_id, name): composition_id for composer_id, name, composition_id in rows})
+            return {key: found[key] for key in keys if key in found}
+
+        composition_ids, unknown_keys = self.composition_ids.split(compositions)
+        composition_ids.update(lookup(sorted(unknown_keys)))
+        missing = sorted(compositions.keys() - composition_ids.keys())
+        if missing:
+            connection.execute(
+                insert(Composition),
+                [
+                    {"composer_id": key[0], "composition_name": compositions[key], "normalized_name": key[1]}
+                    for key in missing
+                ],
+            )
+            composition_ids.update(lookup(missing))
+            stats.compositions_created += len(missing)
+        return composition_ids
+
+    def _bump_data_version(self, connection: Connection) -> None:
+        statement = sqlite_insert(DataVersion).values(id=1, version=1)
+        connection.execute(
+            statement.on_conflict_do_update(index_elements=["id"], set_={"version": DataVersion.version + 1})
+        )
+
+    def get_data_version(self) -> int:
+        """Changes whenever scraped data is written, so anything derived from an older version is stale"""
+        with Session(self.engine) as session:
+            return session.exec(queries.data_version()).first() or 0
+
+    def save_event_data(self, parsed_results: Dict[str, NFM_Event]) -> SaveStats:
+        """Upserts the scraped events and replaces their programmes, using a handful of set-based statements"""
+        stats = SaveStats(events=len(parsed_results))
+        if not parsed_results:
+            return stats
+        if not self._identity_cache_warm:
+            self.warm_identity_cache()
+        started = time.perf_counter()
+        programmes = {event_id: event_data.event_programme for event_id, event_data in parsed_results.items()}
+        with self.engine.begin() as connection:
+            # Writing first takes SQLite's write lock before any lookup, so concurrent writers
+            # (e.g. parallel backfill workers) can't both create the same composer or composition
+            self._upsert_events(connection, parsed_results)
+            unlinked_composition_ids = self._clear_event_compositions(connection, list(parsed_results))
+
+            # names are matched by their normalized form, the first spelling seen becomes the stored name
+            programme_keys = {
+                event_id: [
+                    (composer, normalize_name(composer), composition, normalize_name(composition))
+                    for composer, composition in programme.items()
+                ]
+                for event_id, programme in programmes.items()
+            }
+            composer_names: dict[str, str] = {}
+            for entries in programme_keys.values():
+                for composer, composer_key, _, _ in entries:
+                    composer_names.setdefault(composer_key, composer)
+            composer_ids = self._resolve_composers(connection, composer_names, stats)
+            composition_names: dict[tuple[int, str], str] = {}
+            for entries in programme_keys.values():
+                for _, composer_key, composition, composition_key in entries:
+                    composition_names.setdefault((composer_ids[composer_key], composition_key), composition)
+            composition_ids = self._resolve_compositions(connection, composition_names, stats)
+
+            links = [
+                {"event_id": event_id, "composition_id": composition_id}
+                for event_id, entries in programme_keys.items()
+                for composition_id in dict.fromkeys(
+                    composition_ids[(composer_ids[composer_key], composition_key)]
+                    for _, composer_key, _, composition_key in entries
+                )
+            ]
+            if links:
+                connection.execute(sqlite_insert(EventCompositionLink).on_conflict_do_nothing(), links)
+            stats.links = len(links)
+            # the old and the new compositions of the events, both changed; see refresh_read_models
+            mark_stale(connection, unlinked_composition_ids | set(composition_ids.values()))
+            self._bump_data_version(connection)
+        # cache the ids only once they are committed
+        self.composer_ids.update(composer_ids)
+        self.composition_ids.update(composition_ids)
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def refresh_read_models(self) -> int:
+        """Rebuilds the read models of the compositions changed since the last refresh, returns their count.
+
+        Saving only marks them, scrapers call this once they are done saving.
+        """
+        with self.engine.begin() as connection:
+            refreshed = refresh_stale_read_models(connection)
+            if refreshed:
+                self._bump_data_version(connection)
+        return refreshed
+
+    def save_backfill_progress(
+        self, done_ids: Iterable[int], not_found_ids: Iterable[int], failures: Dict[int, str]
+    ) -> None:
+        """Checkpoints the historical backfill: finished ids are stored as ranges, failures for a retry"""
+        done_ids, not_found_ids = list(done_ids), list(not_found_ids)
+        finished_ids = set(done_ids) | set(not_found_ids)
+        ranges = [
+            {"start_id": start_id, "end_id": end_id, "status": status}
+            for status, ids in (("done", done_ids), ("not_found", not_found_ids))
+            for start_id, end_id in to_ranges(ids)
+        ]
+        with self.engine.begin() as connection:
+            if ranges:
+                connection.execute(insert(BackfillRange), ranges)
+            for ids_chunk in chunked(finished_ids):
+                connection.execute(delete(BackfillFailure).where(col(BackfillFailure.event_id).in_(ids_chunk)))
+            if failures:
+                statement = sqlite_insert(BackfillFailure)
+                statement = statement.on_conflict_do_update(
+                    index_elements=["event_id"],
+                    set_={
+                        "attempts": BackfillFailure.attempts + 1,
+                        "last_error": statement.excluded.last_error,
+                    },
+                )
+                connection.execute(
+                    statement, [{"event_id": event_id, "last_error": error} for event_id, error in failures.items()]
+                )
+
+    def get_backfill_ranges(self) -> list[tuple[int, int]]:
+        """Merged ``(start, end)`` ranges of all event ids the backfill doesn't have to visit again"""
+        with Session(self.engine) as session:
+            rows = session.exec(
+                select(BackfillRange.start_id, BackfillRange.end_id).order_by(col(BackfillRange.start_id))
+            ).all()
+        merged: list[tuple[int, int]] = []
+        for start_id, end_id in rows:
+            if merged and start_id <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end_id))
+            else:
+                merged.append((start_id, end_id))
+        return merged
+
+    def get_backfill_failures(self) -> dict[int, int]:
+        """Event ids the backfill failed to scrape, mapped to the number of attempts so far"""
+        with Session(self.engine) as session:
+            result = session.exec(select(BackfillFailure.event_id, BackfillFailure.attempts)).all()
+            return dict(result)
+
+    def get_event_hashes(self) -> dict[str, Optional[str]]:
+        with Session(self.engine) as session:
+            result = session.exec(select(Event.id, Event.content_hash)).all()
+            return dict(result)
+
+    def restore_listed_events(self, listed_event_ids: Iterable[str]) -> int:
+        """Clears the tombstone of events listed in the calendar again, returns their count.
+
+        An unchanged page is never saved again, so this is the only way back for such an event.
+        """
+        restored = 0
+        with self.engine.begin() as connection:
+            for event_ids_chunk in chunked(listed_event_ids):
+                result = connection.execute(
+                    update(Event)
+                    .where(col(Event.id).in_(event_ids_chunk))
+                    .where(col(Event.tombstoned).is_(True))
+                    .values(tombstoned=False)
+                )
+                restored += result.rowcount
+            if restored:
+                self._bump_data_version(connection)
+        return restored
+
+    def tombstone_missing_events(self, listed_event_ids: Iterable[str], today: Optional[date] = None) -> int:
+        """Marks upcoming events that are no longer listed in the calendar, returns their count.
+
+        Past events drop off the calendar naturally, so only events from ``today`` on are considered.
+        An empty listing means the calendar couldn't be read, not that it's empty, so nothing is marked.
+        """
+        listed_event_ids = list(listed_event_ids)
+        if not listed_event_ids:
+            return 0
+        today = today or date.today()
+        # NOT IN can't be split into chunks, so the whole listing goes in as a single JSON parameter
+        listed = select(func.json_each(json.dumps(listed_event_ids)).table_valued("value").c.value)
+        with Session(self.engine) as session:
+            statement = (
+                update(Event)
+                .where(col(Event.date) >= today)
+                .where(col(Event.id).not_in(listed))
+                .where(col(Event.tombstoned).is_(False))
+                .values(tombstoned=True)
+            )
+            result = session.exec(statement)  # type: ignore [call-overload]
+            if result.rowcount:
+                self._bump_data_version(session.connection())
             session.commit()
+            return int(result.rowcount)
 
-    def get_all_events(self) -> list[str]:
+    def export(self, table: ExportTable, export_format: ExportFormat) -> Iterator[str]:
+        """Yields the whole table as NDJSON or CSV chunks, reading it with a server-side cursor"""
+        columns = export_columns(table)
+        if header := format_header(columns, export_format):
+            yield header
+        with self.engine.connect() as connection:
+            result = connection.execution_options(yield_per=EXPORT_CHUNK_SIZE).execute(export_query(table))
+            for rows in result.partitions():
+                yield format_rows(rows, columns, export_format)
+
+    def get_all_events(self, limit: Optional[int] = None, after: Optional[str] = None) -> list[str]:
         with Session(self.engine) as session:
-            result = session.exec(select(Event.id)).all()
-            return list(result)
+            return list(session.exec(queries.all_event_ids(limit, after)).all())
 
     def get_event_by_id(self, event_id: str) -> Optional[Event]:
         with Session(self.engine) as session:
-            return session.get(Event, event_id)
+            return session.exec(queries.event_by_id(event_id)).first()
+
+    def get_events_between(
+        self,
+        start: date,
+        end: Optional[date] = None,
+        *,
+        composer_id: Optional[int] = None,
+        composition_id: Optional[int] = None,
+        location: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> list[Event]:
+        """Events (with their programmes) from ``start`` to ``end`` in calendar order, see ``queries.calendar``"""
+        statement = queries.calendar(
+            start,
+            end,
+            composer_id=composer_id,
+            composition_id=composition_id,
+            location=location,
+            limit=limit,
+            after=after,
+        )
+        with Session(self.engine) as session:
+            return list(session.exec(statement).all())
+
+    def get_upcoming_events(
+        self,
+        limit: int = 10,
+        *,
+        composer_id: Optional[int] = None,
+        composition_id: Optional[int] = None,
+        location: Optional[str] = None,
+        today: Optional[date] = None,
+    ) -> list[Event]:
+        """The next ``limit`` events from ``today`` on, with their programmes"""
+        return self.get_events_between(
+            today or date.today(),
+            composer_id=composer_id,
+            composition_id=composition_id,
+            location=location,
+            limit=limit,
+        )
 
-    def get_all_compositions(self) -> list[Composition]:
+    def get_all_compositions(self, limit: Optional[int] = None, after: Optional[int] = None) -> list[Composition]:
         with Session(self.engine) as session:
-            result = session.exec(select(Composition)).all()
-            return list(result)
+            return list(session.exec(queries.all_compositions(limit, after)).all())
 
     def search_compositions_by_name(self, search_term: str) -> list[Composition]:
         with Session(self.engine) as session:
-            query = (
-                select(Composition)
-                .where(cast(Column[str], Composition.composition_name).like(f"%{search_term}%"))
-                .options(
-                    selectinload(Composition.composer),  # type: ignore [arg-type]
-                    selectinload(Composition.events),  # type: ignore [arg-type]
-                )
-            )
-            result = session.exec(query).all()
-            return list(result)
+            return list(session.exec(queries.search_compositions_by_name(search_term)).all())
 
     def get_composition_by_id(self, composition_id: int) -> Optional[Composition]:
         with Session(self.engine) as session:
-            statement = (
-                select(Composition)
-                .where(Composition.id == composition_id)
-                .options(
-                    selectinload(Composition.composer),  # type: ignore [arg-type]
-                    selectinload(Composition.events),  # type: ignore [arg-type]
-                )
-            )
-            return session.exec(statement).first()
+            return session.exec(queries.composition_by_id(composition_id)).first()
 
-    def get_all_composers(self) -> list[Composer]:
+    def get_composition_detail(self, composition_id: int) -> Optional[str]:
+        """The composition with its composer, events and performance stats, as ``CompositionDetail`` JSON"""
         with Session(self.engine) as session:
-            result = session.exec(select(Composer)).all()
-            return list(result)
+            return session.exec(queries.composition_detail(composition_id)).first()
+
+    def get_all_composers(self, limit: Optional[int] = None, after: Optional[int] = None) -> list[Composer]:
+        with Session(self.engine) as session:
+            return list(session.exec(queries.all_composers(limit, after)).all())
 
     def search_composers_by_name(self, search_term: str) -> list[Composer]:
         with Session(self.engine) as session:
-            query = select(Composer).where(cast(Column[str], Composer.composer_name).like(f"%{search_term}%"))
-            result = session.exec(query).all()
-            return list(result)
+            return list(session.exec(queries.search_composers_by_name(search_term)).all())
 
     def get_composer_by_id(self, composer_id: int) -> Optional[Composer]:
         with Session(self.engine) as session:
-            statement = (
-                select(Composer)
-                .where(Composer.id == composer_id)
-                .options(
-                    selectinload(Composer.compositions).selectinload(Composition.events),  # type: ignore [arg-type]
-                    selectinload(Composer.compositions).selectinload(Composition.composer),  # type: ignore [arg-type]
-                )
-            )
-            result = session.exec(statement).first()
-            return result
+            return session.exec(queries.composer_by_id(composer_id)).first()
+
+    def get_composer_detail(self, composer_id: int) -> Optional[str]:
+        """The composer with its compositions and performance stats, as ``ComposerDetail`` JSON"""
+        with Session(self.engine) as session:
+            return session.exec(queries.composer_detail(composer_id)).first()
 
     def get_compositions_by_event(self, event_id: str) -> list[Composition]:
         with Session(self.engine) as session:
-            statement = (
-                select(Composition)
-                .join(EventCompositionLink)
-                .where(EventCompositionLink.event_id == event_id)
-                .options(
-                    selectinload(Composition.composer),  # type: ignore [arg-type]
-                    selectinload(Composition.events),  # type: ignore [arg-type]
-                )
-            )
-            result = session.exec(statement).all()
-            return list(result)
+            return list(session.exec(queries.compositions_by_event(event_id)).all())
 
     def get_compositions_by_composer(self, composer_name: str) -> list[Composition]:
         with Session(self.engine) as session:
-            result = session.exec(
-                select(Composition)
-                .join(Composer)
-                .where(Composer.composer_name == composer_name)
-                .options(
-                    selectinload(Composition.composer),  # type: ignore [arg-type]
-                    selectinload(Composition.events),  # type: ignore [arg-type]
-                )
-            ).all()
-            return list(result)
-
-
-def get_db() -> Generator[DatabaseHandler, None, None]:
-    db = DatabaseHandler()
-    try:
-        yield db
-    finally:
-        pass
+            return list(session.exec(queries.compositions_by_composer(composer_name)).all())
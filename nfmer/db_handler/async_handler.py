@@ -0,0 +1,171 @@
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from nfmer.db_handler import queries
+from nfmer.db_handler.export import (
+    EXPORT_CHUNK_SIZE,
+    ExportFormat,
+    ExportTable,
+    export_columns,
+    export_query,
+    format_header,
+    format_rows,
+)
+from nfmer.db_handler.profile import SQLiteProfile, apply_profile
+from nfmer.db_handler.schema import migrate
+from nfmer.models import Composer, Composition, Event
+
+
+class AsyncDatabaseHandler:
+    """Read-only counterpart of ``DatabaseHandler`` for the API, on an async engine (aiosqlite).
+
+    Runs the same queries, but awaits them instead of blocking a worker thread. Relationships are
+    loaded eagerly, so the returned objects can be serialised after the session is closed.
+    A plain ``sqlite://`` URL (as used by the scraper) is switched to the aiosqlite driver.
+    Meant to be created once per process: the engine keeps a pool of ``pool_size`` connections.
+    The pooled connections are read-only (``query_only``) and read a WAL snapshot, so they never
+    wait for the scraper's writes; only ``create_schema`` writes, through a connection of its own.
+    """
+
+    def __init__(
+        self,
+        db_url: str = "sqlite+aiosqlite:///events.db",
+        pool_size: int = 5,
+        profile: SQLiteProfile = SQLiteProfile(),
+    ):
+        url = make_url(db_url)
+        if url.drivername == "sqlite":
+            url = url.set(drivername="sqlite+aiosqlite")
+        self.url = url
+        self.profile = profile
+        self.in_memory = url.database in (None, "", ":memory:")  # a single shared connection, no pool to size
+        if self.in_memory:
+            # there is no other connection that could create the schema of this database
+            self.engine = create_async_engine(url)
+            apply_profile(self.engine.sync_engine, profile)
+        else:
+            self.engine = create_async_engine(url, pool_size=pool_size)
+            apply_profile(self.engine.sync_engine, profile.read_only())
+
+    async def create_schema(self) -> None:
+        if self.in_memory:
+            async with self.engine.begin() as connection:
+                await connection.run_sync(migrate)
+            return
+        writer = create_async_engine(self.url, poolclass=NullPool)
+        apply_profile(writer.sync_engine, self.profile)
+        try:
+            async with writer.begin() as connection:
+                await connection.run_sync(migrate)
+        finally:
+            await writer.dispose()
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+    async def export(self, table: ExportTable, export_format: ExportFormat) -> AsyncIterator[str]:
+        """Yields the whole table as NDJSON or CSV chunks, reading it with a server-side cursor"""
+        columns = export_columns(table)
+        if header := format_header(columns, export_format):
+            yield header
+        async with self.engine.connect() as connection:
+            result = await connection.stream(export_query(table))
+            async for rows in result.partitions(EXPORT_CHUNK_SIZE):
+                yield format_rows(rows, columns, export_format)
+
+    async def get_data_version(self) -> int:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.data_version())).first() or 0
+
+    async def get_all_events(self, limit: Optional[int] = None, after: Optional[str] = None) -> list[str]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.all_event_ids(limit, after))).all())
+
+    async def get_event_by_id(self, event_id: str) -> Optional[Event]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.event_by_id(event_id))).first()
+
+    async def get_events_between(
+        self,
+        start: date,
+        end: Optional[date] = None,
+        *,
+        composer_id: Optional[int] = None,
+        composition_id: Optional[int] = None,
+        location: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> list[Event]:
+        statement = queries.calendar(
+            start,
+            end,
+            composer_id=composer_id,
+            composition_id=composition_id,
+            location=location,
+            limit=limit,
+            after=after,
+        )
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(statement)).all())
+
+    async def get_upcoming_events(
+        self,
+        limit: int = 10,
+        *,
+        composer_id: Optional[int] = None,
+        composition_id: Optional[int] = None,
+        location: Optional[str] = None,
+        today: Optional[date] = None,
+    ) -> list[Event]:
+        return await self.get_events_between(
+            today or date.today(),
+            composer_id=composer_id,
+            composition_id=composition_id,
+            location=location,
+            limit=limit,
+        )
+
+    async def get_all_compositions(self, limit: Optional[int] = None, after: Optional[int] = None) -> list[Composition]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.all_compositions(limit, after))).all())
+
+    async def search_compositions_by_name(self, search_term: str) -> list[Composition]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.search_compositions_by_name(search_term))).all())
+
+    async def get_composition_by_id(self, composition_id: int) -> Optional[Composition]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.composition_by_id(composition_id))).first()
+
+    async def get_composition_detail(self, composition_id: int) -> Optional[str]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.composition_detail(composition_id))).first()
+
+    async def get_all_composers(self, limit: Optional[int] = None, after: Optional[int] = None) -> list[Composer]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.all_composers(limit, after))).all())
+
+    async def search_composers_by_name(self, search_term: str) -> list[Composer]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.search_composers_by_name(search_term))).all())
+
+    async def get_composer_by_id(self, composer_id: int) -> Optional[Composer]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.composer_by_id(composer_id))).first()
+
+    async def get_composer_detail(self, composer_id: int) -> Optional[str]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(queries.composer_detail(composer_id))).first()
+
+    async def get_compositions_by_event(self, event_id: str) -> list[Composition]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.compositions_by_event(event_id))).all())
+
+    async def get_compositions_by_composer(self, composer_name: str) -> list[Composition]:
+        async with AsyncSession(self.engine) as session:
+            return list((await session.exec(queries.compositions_by_composer(composer_name))).all())
@@ -0,0 +1,13 @@
+from itertools import islice
+from typing import Generator, Iterable, TypeVar
+
+# Keeps IN (...) lists well below SQLite's limit of bound parameters per statement
+MAX_IN_PARAMETERS = 500
+
+T = TypeVar("T")
+
+
+def chunked(items: Iterable[T], size: int = MAX_IN_PARAMETERS) -> Generator[list[T], None, None]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,75 @@
+"""Bulk export of the catalogue as NDJSON or CSV, one table at a time.
+
+Rows are read with a server-side cursor in chunks of ``EXPORT_CHUNK_SIZE`` and every chunk is
+formatted into one string, so a dump never holds more than a chunk of rows in memory.
+"""
+
+import csv
+import io
+import json
+from datetime import date
+from enum import Enum
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import Select, select
+from sqlmodel import SQLModel
+
+from nfmer.models import Composer, Composition, Event, EventCompositionLink
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ExportTable(str, Enum):
+    EVENTS = "events"
+    COMPOSERS = "composers"
+    COMPOSITIONS = "compositions"
+    LINKS = "links"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is ExportFormat.NDJSON else "text/csv"
+
+
+# exported columns, the first ones are the primary key the rows are ordered by
+EXPORT_COLUMNS: dict[ExportTable, tuple[type[SQLModel], list[str], int]] = {
+    ExportTable.EVENTS: (Event, ["id", "date", "hour", "location", "url", "tombstoned"], 1),
+    ExportTable.COMPOSERS: (Composer, ["id", "composer_name"], 1),
+    ExportTable.COMPOSITIONS: (Composition, ["id", "composer_id", "composition_name"], 1),
+    ExportTable.LINKS: (EventCompositionLink, ["event_id", "composition_id"], 2),
+}
+
+
+def export_columns(table: ExportTable) -> list[str]:
+    return EXPORT_COLUMNS[table][1]
+
+
+def export_query(table: ExportTable) -> Select[Any]:
+    model, columns, key_length = EXPORT_COLUMNS[table]
+    sa_table = model.__table__  # type: ignore [attr-defined]
+    selected = [sa_table.c[name] for name in columns]
+    return select(*selected).order_by(*selected[:key_length])
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def format_rows(rows: Iterable[Sequence[Any]], columns: list[str], export_format: ExportFormat) -> str:
+    """Formats a chunk of rows; CSV chunks don't have the header, see ``format_header``"""
+    if export_format is ExportFormat.NDJSON:
+        return "".join(
+            json.dumps({name: _json_value(value) for name, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def format_header(columns: list[str], export_format: ExportFormat) -> str:
+    return format_rows([columns], columns, export_format) if export_format is ExportFormat.CSV else ""
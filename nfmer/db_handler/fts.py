@@ -0,0 +1,65 @@
+"""FTS5 trigram indexes behind the composer and composition search.
+
+The indexes are external-content tables: they store only the index, the names stay in the
+``composers``/``compositions`` tables and triggers keep both in sync on every write.
+The trigram tokenizer matches any substring of at least 3 characters, so it answers the same
+queries as ``LIKE '%term%'`` without scanning the table. The normalized names are indexed, so
+search terms have to be normalized too and matches ignore case and diacritics.
+"""
+
+from sqlalchemy import Connection, TableClause, column, table, text
+
+MIN_QUERY_LENGTH = 3  # trigrams can't match anything shorter
+
+# indexed table -> (FTS table, indexed column)
+SEARCH_INDEXES = {
+    "composers": ("composers_fts", "normalized_name"),
+    "compositions": ("compositions_fts", "normalized_name"),
+}
+
+
+def fts_table(source_table: str) -> TableClause:
+    """The FTS table of ``source_table``; its hidden column of the same name is the MATCH target"""
+    fts_name, _ = SEARCH_INDEXES[source_table]
+    return table(fts_name, column("rowid"), column("rank"), column(fts_name))
+
+
+def match_phrase(search_term: str) -> str:
+    """Quotes the user input as a single FTS5 phrase, so operators and quotes in it are literal"""
+    return '"' + search_term.replace('"', '""') + '"'
+
+
+def _drop_ddl(fts_name: str) -> list[str]:
+    return [f"DROP TRIGGER IF EXISTS {fts_name}_{event}" for event in ("insert", "delete", "update")] + [
+        f"DROP TABLE IF EXISTS {fts_name}"
+    ]
+
+
+def _create_ddl(source_table: str, fts_name: str, name_column: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE {fts_name} USING fts5("
+        f"{name_column}, content='{source_table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {fts_name}_insert AFTER INSERT ON {source_table} BEGIN "
+        f"INSERT INTO {fts_name}(rowid, {name_column}) VALUES (new.id, new.{name_column}); END",
+        f"CREATE TRIGGER {fts_name}_delete AFTER DELETE ON {source_table} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {name_column}) VALUES ('delete', old.id, old.{name_column}); "
+        f"END",
+        f"CREATE TRIGGER {fts_name}_update AFTER UPDATE OF {name_column} ON {source_table} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {name_column}) VALUES ('delete', old.id, old.{name_column}); "
+        f"INSERT INTO {fts_name}(rowid, {name_column}) VALUES (new.id, new.{name_column}); END",
+        # index the rows that were there before the index
+        f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')",
+    ]
+
+
+def _indexed_columns(connection: Connection, fts_name: str) -> list[str]:
+    return [row.name for row in connection.execute(text(f"PRAGMA table_info({fts_name})"))]
+
+
+def create_search_indexes(connection: Connection) -> None:
+    """Creates missing or outdated FTS tables and their triggers, indexing the existing rows"""
+    for source_table, (fts_name, name_column) in SEARCH_INDEXES.items():
+        if _indexed_columns(connection, fts_name) == [name_column]:
+            continue
+        for statement in _drop_ddl(fts_name) + _create_ddl(source_table, fts_name, name_column):
+            connection.execute(text(statement))
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterable, Mapping, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+DEFAULT_MAX_SIZE = 200_000
+
+
+class IdentityCache(Generic[K]):
+    """Bounded LRU mapping of natural keys (e.g. composer names) to primary keys.
+
+    Only ids of committed rows should be put here: a rolled back transaction would otherwise
+    leave ids in the cache that don't exist in the database.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._ids: OrderedDict[K, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._ids
+
+    def get(self, key: K) -> Optional[int]:
+        row_id = self._ids.get(key)
+        if row_id is None:
+            self.misses += 1
+            return None
+        self._ids.move_to_end(key)
+        self.hits += 1
+        return row_id
+
+    def split(self, keys: Iterable[K]) -> tuple[dict[K, int], set[K]]:
+        """Returns the ids of cached keys and the set of keys that have to be looked up"""
+        known: dict[K, int] = {}
+        unknown: set[K] = set()
+        for key in keys:
+            row_id = self.get(key)
+            if row_id is None:
+                unknown.add(key)
+            else:
+                known[key] = row_id
+        return known, unknown
+
+    def put(self, key: K, row_id: int) -> None:
+        self._ids[key] = row_id
+        self._ids.move_to_end(key)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def update(self, ids: Mapping[K, int]) -> None:
+        for key, row_id in ids.items():
+            self.put(key, row_id)
+
+    def clear(self) -> None:
+        self._ids.clear()
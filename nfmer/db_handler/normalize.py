@@ -0,0 +1,16 @@
+import re
+import unicodedata
+
+# letters that NFKD doesn't decompose into a base letter and a diacritic
+_UNDECOMPOSABLE = str.maketrans({"ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "đ": "d", "Đ": "D", "ħ": "h", "Ħ": "H"})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_name(name: str) -> str:
+    """Matching key of a composer or composition name: no diacritics, casefolded, single spaces.
+
+    "Dvořák,  Antonín" and "dvorak, antonin" (or with a non-breaking space) have the same key.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.translate(_UNDECOMPOSABLE))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE.sub(" ", stripped.casefold()).strip()
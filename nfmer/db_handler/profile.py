@@ -0,0 +1,49 @@
+"""Per-connection SQLite settings, so the scraper can write while the API keeps reading.
+
+In WAL mode readers see the last committed snapshot and are never blocked by a writer
+(nor block it), ``synchronous=NORMAL`` is durable enough with WAL and syncs far less,
+and reads go through a memory map and a larger page cache instead of ``read()`` calls.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    mmap_size: int = 256 * 1024 * 1024  # bytes
+    cache_size: int = -64 * 1024  # negative: in KiB, not in pages
+    temp_store: str = "memory"
+    busy_timeout: int = 5000  # ms a writer waits for the lock before failing with "database is locked"
+    query_only: bool = False
+
+    def read_only(self) -> "SQLiteProfile":
+        return replace(self, query_only=True)
+
+    def pragmas(self) -> list[str]:
+        return [
+            f"PRAGMA journal_mode = {self.journal_mode}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA mmap_size = {self.mmap_size}",
+            f"PRAGMA cache_size = {self.cache_size}",
+            f"PRAGMA temp_store = {self.temp_store}",
+            f"PRAGMA busy_timeout = {self.busy_timeout}",
+            f"PRAGMA query_only = {int(self.query_only)}",
+        ]
+
+
+def apply_profile(engine: Engine, profile: SQLiteProfile) -> None:
+    """Applies the profile to every new connection of the (sync, or an async engine's ``sync_engine``) engine"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in profile.pragmas():
+            cursor.execute(pragma)
+        cursor.close()
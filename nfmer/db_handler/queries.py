@@ -0,0 +1,185 @@
+"""Read queries shared by the sync and the async database handlers"""
+
+from datetime import date
+from typing import Optional, cast
+
+from sqlalchemy import ColumnElement, and_, tuple_
+from sqlalchemy.orm import aliased, selectinload
+from sqlmodel import Column, col, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from nfmer.db_handler.fts import MIN_QUERY_LENGTH, fts_table, match_phrase
+from nfmer.db_handler.normalize import normalize_name
+from nfmer.models import (
+    Composer,
+    ComposerSummary,
+    Composition,
+    CompositionSummary,
+    DataVersion,
+    Event,
+    EventCompositionLink,
+)
+
+PREFIX_RANGE_END = "\U0010ffff"  # sorts after every character that can follow the prefix
+
+
+def normalized_name(model: type[Composer] | type[Composition]) -> Column[str]:
+    return cast(Column[str], model.normalized_name)
+
+
+def data_version() -> SelectOfScalar[int]:
+    return select(DataVersion.version).where(DataVersion.id == 1)
+
+
+def all_event_ids(limit: Optional[int] = None, after: Optional[str] = None) -> SelectOfScalar[str]:
+    """Event ids in primary key order; ``after`` is the last id of the previous page (keyset pagination)"""
+    statement = select(Event.id).order_by(col(Event.id)).limit(limit)
+    return statement if after is None else statement.where(Event.id > after)
+
+
+def event_by_id(event_id: str) -> SelectOfScalar[Event]:
+    """The event with its programme: compositions and their composers"""
+    return (
+        select(Event)
+        .where(Event.id == event_id)
+        .options(selectinload(Event.compositions).selectinload(Composition.composer))  # type: ignore [arg-type]
+    )
+
+
+def calendar(
+    start: date,
+    end: Optional[date] = None,
+    *,
+    composer_id: Optional[int] = None,
+    composition_id: Optional[int] = None,
+    location: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+) -> SelectOfScalar[Event]:
+    """Events from ``start`` to ``end`` (both inclusive) with their programmes, in the order they take place.
+
+    Tombstoned (cancelled) events are left out. The date range runs on the ``events.date`` index, the
+    composer and composition filters on the link index. ``after`` is the id of the last event of the
+    previous page: the page continues after its (date, hour, id), keyset pagination over that order.
+    """
+    statement = (
+        select(Event)
+        .where(col(Event.date) >= start)
+        .where(col(Event.tombstoned).is_(False))
+        .order_by(col(Event.date), col(Event.hour), col(Event.id))
+        .limit(limit)
+        .options(selectinload(Event.compositions).selectinload(Composition.composer))  # type: ignore [arg-type]
+    )
+    if end is not None:
+        statement = statement.where(col(Event.date) <= end)
+    if location is not None:
+        statement = statement.where(Event.location == location)
+    if composition_id is not None:
+        statement = statement.where(
+            col(Event.id).in_(
+                select(EventCompositionLink.event_id).where(EventCompositionLink.composition_id == composition_id)
+            )
+        )
+    if composer_id is not None:
+        statement = statement.where(
+            col(Event.id).in_(
+                select(EventCompositionLink.event_id)
+                .join(Composition, col(Composition.id) == EventCompositionLink.composition_id)
+                .where(Composition.composer_id == composer_id)
+            )
+        )
+    if after is not None:
+        previous = aliased(Event)
+        statement = statement.where(
+            tuple_(col(Event.date), col(Event.hour), col(Event.id))
+            > select(col(previous.date), col(previous.hour), col(previous.id))
+            .where(previous.id == after)
+            .scalar_subquery()
+        )
+    return statement
+
+
+def all_compositions(limit: Optional[int] = None, after: Optional[int] = None) -> SelectOfScalar[Composition]:
+    statement = select(Composition).order_by(col(Composition.id)).limit(limit)
+    return statement if after is None else statement.where(col(Composition.id) > after)
+
+
+def compositions_with_details() -> SelectOfScalar[Composition]:
+    """Compositions with their composer and events loaded, ready to be serialised without a session"""
+    return select(Composition).options(
+        selectinload(Composition.composer),  # type: ignore [arg-type]
+        selectinload(Composition.events),  # type: ignore [arg-type]
+    )
+
+
+def prefix_range(column: Column[str], prefix: str) -> ColumnElement[bool]:
+    """``column LIKE 'prefix%'`` as a range condition, which can use the column's index"""
+    return and_(column >= prefix, column < prefix + PREFIX_RANGE_END)
+
+
+def search_compositions_by_name(search_term: str) -> SelectOfScalar[Composition]:
+    """Ignores case and diacritics, best matches first; terms too short for the FTS index match name prefixes"""
+    search_key = normalize_name(search_term)
+    if len(search_key) < MIN_QUERY_LENGTH:
+        return compositions_with_details().where(prefix_range(normalized_name(Composition), search_key))
+    fts = fts_table("compositions")
+    return (
+        compositions_with_details()
+        .join(fts, fts.c.rowid == Composition.id)
+        .where(fts.c.compositions_fts.match(match_phrase(search_key)))
+        .order_by(fts.c.rank)
+    )
+
+
+def composition_by_id(composition_id: int) -> SelectOfScalar[Composition]:
+    return compositions_with_details().where(Composition.id == composition_id)
+
+
+def all_composers(limit: Optional[int] = None, after: Optional[int] = None) -> SelectOfScalar[Composer]:
+    statement = select(Composer).order_by(col(Composer.id)).limit(limit)
+    return statement if after is None else statement.where(col(Composer.id) > after)
+
+
+def search_composers_by_name(search_term: str) -> SelectOfScalar[Composer]:
+    """Ignores case and diacritics, best matches first; terms too short for the FTS index match name prefixes"""
+    search_key = normalize_name(search_term)
+    if len(search_key) < MIN_QUERY_LENGTH:
+        return select(Composer).where(prefix_range(normalized_name(Composer), search_key))
+    fts = fts_table("composers")
+    return (
+        select(Composer)
+        .join(fts, fts.c.rowid == Composer.id)
+        .where(fts.c.composers_fts.match(match_phrase(search_key)))
+        .order_by(fts.c.rank)
+    )
+
+
+def composer_by_id(composer_id: int) -> SelectOfScalar[Composer]:
+    return (
+        select(Composer)
+        .where(Composer.id == composer_id)
+        .options(
+            selectinload(Composer.compositions).options(  # type: ignore [arg-type]
+                selectinload(Composition.events),  # type: ignore [arg-type]
+                selectinload(Composition.composer),  # type: ignore [arg-type]
+            )
+        )
+    )
+
+
+def composer_detail(composer_id: int) -> SelectOfScalar[str]:
+    """The precomputed ``ComposerDetail`` JSON of the composer, see ``read_models``"""
+    return select(ComposerSummary.payload).where(ComposerSummary.composer_id == composer_id)
+
+
+def composition_detail(composition_id: int) -> SelectOfScalar[str]:
+    """The precomputed ``CompositionDetail`` JSON of the composition, see ``read_models``"""
+    return select(CompositionSummary.payload).where(CompositionSummary.composition_id == composition_id)
+
+
+def compositions_by_event(event_id: str) -> SelectOfScalar[Composition]:
+    return compositions_with_details().join(EventCompositionLink).where(EventCompositionLink.event_id == event_id)
+
+
+def compositions_by_composer(composer_name: str) -> SelectOfScalar[Composition]:
+    return compositions_with_details().join(Composer).where(Composer.normalized_name == normalize_name(composer_name))
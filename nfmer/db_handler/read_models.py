@@ -0,0 +1,197 @@
+"""Denormalized read models behind the composer and composition detail endpoints.
+
+Every composition has a ``CompositionSummary`` and every composer a ``ComposerSummary`` row,
+holding the whole detail response as JSON plus its performance stats, so serving a detail page
+is a single primary key lookup. Rebuilding the summary of a popular composer means reading
+all its events, so ``save_event_data`` only marks the compositions it touched as stale and
+``refresh_stale_read_models`` rebuilds them (and their composers) once, at the end of a scrape.
+Until then the details of the touched compositions lag behind the saved events.
+
+The payloads are the JSON of ``CompositionDetail`` and ``ComposerDetail``, built from plain
+dicts, and a composer's payload splices in the stored payloads of its compositions, so their
+events aren't serialised again.
+"""
+
+import json
+from collections import defaultdict
+from datetime import date
+from typing import Any, Iterable
+
+from sqlalchemy import Connection, delete, distinct, func
+from sqlalchemy import select as sa_select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import SQLModel, col, select
+
+from nfmer.db_handler.batching import chunked
+from nfmer.models import (
+    Composer,
+    ComposerSummary,
+    Composition,
+    CompositionSummary,
+    Event,
+    EventCompositionLink,
+    StaleComposition,
+)
+
+
+def _upsert(connection: Connection, model: type[SQLModel], key: str, rows: list[dict[str, Any]]) -> None:
+    statement = sqlite_insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=[key], set_={name: statement.excluded[name] for name in rows[0] if name != key}
+    )
+    connection.execute(statement, rows)
+
+
+def _composition_details(connection: Connection, composition_ids: list[int]) -> list[dict[str, Any]]:
+    """``CompositionDetail``s as plain dicts: building them with json is far cheaper than through the models"""
+    events: dict[int, list[dict[str, Any]]] = defaultdict(list)
+    rows = connection.execute(
+        sa_select(
+            col(EventCompositionLink.composition_id),
+            col(Event.id),
+            col(Event.location),
+            col(Event.date),
+            col(Event.hour),
+            col(Event.url),
+        )
+        .join(Event, col(Event.id) == EventCompositionLink.event_id)
+        .where(col(EventCompositionLink.composition_id).in_(composition_ids))
+        .order_by(col(Event.date), col(Event.hour), col(Event.id))
+    )
+    for composition_id, event_id, location, event_date, hour, url in rows:
+        events[composition_id].append(
+            {"location": location, "date": event_date.isoformat(), "hour": hour, "url": url, "id": event_id}
+        )
+    compositions = connection.execute(
+        select(Composition.id, Composition.composition_name, Composer.id, Composer.composer_name)
+        .join(Composer, col(Composer.id) == Composition.composer_id)
+        .where(col(Composition.id).in_(composition_ids))
+    )
+    return [
+        {
+            "composition_name": composition_name,
+            "id": composition_id,
+            "composer": {"composer_name": composer_name, "id": composer_id},
+            "events": events[composition_id],
+            "event_count": len(events[composition_id]),
+            "first_performance": events[composition_id][0]["date"] if events[composition_id] else None,
+            "last_performance": events[composition_id][-1]["date"] if events[composition_id] else None,
+        }
+        for composition_id, composition_name, composer_id, composer_name in compositions
+    ]
+
+
+def _summary_row(detail: dict[str, Any], **columns: int) -> dict[str, Any]:
+    """The summary table row of a detail dict, ``columns`` are its keys and other extra columns"""
+    first, last = detail["first_performance"], detail["last_performance"]
+    return columns | {
+        "event_count": detail["event_count"],
+        "first_performance": date.fromisoformat(first) if first else None,
+        "last_performance": date.fromisoformat(last) if last else None,
+        "payload": json.dumps(detail, ensure_ascii=False),
+    }
+
+
+def rebuild_composition_summaries(connection: Connection, composition_ids: Iterable[int]) -> set[int]:
+    """Rebuilds the summaries of the given compositions, returns the ids of their composers"""
+    composer_ids: set[int] = set()
+    for composition_ids_chunk in chunked(sorted(set(composition_ids))):
+        details = _composition_details(connection, composition_ids_chunk)
+        if not details:
+            continue
+        rows = [
+            _summary_row(detail, composition_id=detail["id"], composer_id=detail["composer"]["id"])
+            for detail in details
+        ]
+        _upsert(connection, CompositionSummary, "composition_id", rows)
+        composer_ids.update(detail["composer"]["id"] for detail in details)
+    return composer_ids
+
+
+def _performance_stats(connection: Connection, composer_ids: list[int]) -> dict[int, tuple[int, date, date]]:
+    """Composer id -> (number of events, first and last event date), for composers with any events"""
+    rows = connection.execute(
+        select(
+            Composition.composer_id,
+            func.count(distinct(col(EventCompositionLink.event_id))),
+            func.min(Event.date),
+            func.max(Event.date),
+        )
+        .join(EventCompositionLink, col(EventCompositionLink.composition_id) == Composition.id)
+        .join(Event, col(Event.id) == EventCompositionLink.event_id)
+        .where(col(Composition.composer_id).in_(composer_ids))
+        .group_by(col(Composition.composer_id))
+    )
+    return {composer_id: (event_count, first, last) for composer_id, event_count, first, last in rows}
+
+
+def rebuild_composer_summaries(connection: Connection, composer_ids: Iterable[int]) -> None:
+    """Rebuilds the summaries of the given composers out of the summaries of their compositions"""
+    for composer_ids_chunk in chunked(sorted(set(composer_ids))):
+        payloads: dict[int, list[str]] = defaultdict(list)
+        rows = connection.execute(
+            select(CompositionSummary.composer_id, CompositionSummary.payload)
+            .where(col(CompositionSummary.composer_id).in_(composer_ids_chunk))
+            .order_by(col(CompositionSummary.composition_id))
+        )
+        for composer_id, payload in rows:
+            payloads[composer_id].append(payload)
+        stats = _performance_stats(connection, composer_ids_chunk)
+        composers = connection.execute(
+            select(Composer.id, Composer.composer_name).where(col(Composer.id).in_(composer_ids_chunk))
+        )
+        summaries = []
+        for composer_id, composer_name in composers:
+            event_count, first, last = stats.get(composer_id, (0, None, None))
+            detail = {
+                "composer_name": composer_name,
+                "id": composer_id,
+                "event_count": event_count,
+                "first_performance": first.isoformat() if first else None,
+                "last_performance": last.isoformat() if last else None,
+                "composition_count": len(payloads[composer_id]),
+            }
+            summary = _summary_row(detail, composer_id=composer_id, composition_count=detail["composition_count"])
+            # the compositions are spliced in as they are stored, instead of being decoded and encoded again
+            compositions = ", ".join(payloads[composer_id])
+            summary["payload"] = summary["payload"][:-1] + f', "compositions": [{compositions}]}}'
+            summaries.append(summary)
+        if summaries:
+            _upsert(connection, ComposerSummary, "composer_id", summaries)
+
+
+def rebuild_read_models(connection: Connection, composition_ids: Iterable[int]) -> None:
+    """Rebuilds the summaries of the given compositions and of their composers"""
+    rebuild_composer_summaries(connection, rebuild_composition_summaries(connection, composition_ids))
+
+
+def mark_stale(connection: Connection, composition_ids: Iterable[int]) -> None:
+    """Queues the compositions (and so their composers) for ``refresh_stale_read_models``"""
+    rows = [{"composition_id": composition_id} for composition_id in set(composition_ids)]
+    if rows:
+        connection.execute(sqlite_insert(StaleComposition).on_conflict_do_nothing(), rows)
+
+
+def refresh_stale_read_models(connection: Connection) -> int:
+    """Rebuilds the summaries of the stale compositions and of their composers, returns their count"""
+    # taking the marks in a single DELETE holds SQLite's write lock from the start, so a composition
+    # marked by a concurrent save is either rebuilt here or stays marked for the next refresh
+    stale_ids = set(
+        connection.execute(delete(StaleComposition).returning(col(StaleComposition.composition_id))).scalars()
+    )
+    rebuild_read_models(connection, stale_ids)
+    return len(stale_ids)
+
+
+def build_missing_read_models(connection: Connection) -> None:
+    """Builds the summaries of rows written before the read models existed"""
+    missing_compositions = connection.execute(
+        select(Composition.id).where(
+            col(Composition.id).not_in(select(CompositionSummary.composition_id).scalar_subquery())
+        )
+    ).scalars()
+    composer_ids = rebuild_composition_summaries(connection, missing_compositions)
+    missing_composers = connection.execute(
+        select(Composer.id).where(col(Composer.id).not_in(select(ComposerSummary.composer_id).scalar_subquery()))
+    ).scalars()
+    rebuild_composer_summaries(connection, composer_ids | set(missing_composers))
@@ -0,0 +1,58 @@
+"""Creates and migrates the database schema, for both the scraper and the API"""
+
+from sqlalchemy import Connection, Table, bindparam, inspect, text, update
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel, select
+
+from nfmer.db_handler import fts
+from nfmer.db_handler.normalize import normalize_name
+from nfmer.db_handler.read_models import build_missing_read_models
+from nfmer.models import Composer, Composition
+
+
+def add_missing_columns(connection: Connection) -> None:
+    # create_all() only creates missing tables, columns added to the models later
+    # have to be appended to tables of an already existing database
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+
+
+def create_missing_indexes(connection: Connection) -> None:
+    # the same goes for indexes added to tables that already exist
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+
+def backfill_normalized_names(connection: Connection) -> None:
+    """Fills ``normalized_name`` of rows written before the column existed"""
+    for model, name_column in ((Composer, Composer.composer_name), (Composition, Composition.composition_name)):
+        table: Table = model.__table__  # type: ignore [union-attr]
+        rows = connection.execute(select(table.c.id, name_column).where(table.c.normalized_name == "")).all()
+        if rows:
+            connection.execute(
+                update(table).where(table.c.id == bindparam("row_id")),
+                [{"row_id": row_id, "normalized_name": normalize_name(name)} for row_id, name in rows],
+            )
+
+
+def migrate(connection: Connection) -> None:
+    """Brings the database up to the current models: tables, columns, indexes, search indexes and read models"""
+    # pysqlite runs DDL outside of a transaction, so processes starting on a fresh database together
+    # would race to create the same tables; holding the write lock from the start makes them take turns
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+    SQLModel.metadata.create_all(connection)
+    add_missing_columns(connection)
+    create_missing_indexes(connection)
+    backfill_normalized_names(connection)
+    fts.create_search_indexes(connection)
+    build_missing_read_models(connection)
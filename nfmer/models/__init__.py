@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from datetime import date
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -12,6 +13,7 @@ class NFM_Event:
     location: str = ""
     date: date = date(9999, 12, 31)
     hour: str = "00:00:00"
+    content_hash: str = ""
 
 
 class EventBase(SQLModel):
@@ -23,6 +25,8 @@ class EventBase(SQLModel):
 
 class EventCompositionLink(SQLModel, table=True):
     __tablename__ = "event_composition_link"
+    # the primary key serves lookups by event, this index the ones by composition (it covers both columns)
+    __table_args__ = (Index("ix_event_composition_link_composition_id_event_id", "composition_id", "event_id"),)
     event_id: str = Field(foreign_key="events.id", primary_key=True)
     composition_id: int = Field(foreign_key="compositions.id", primary_key=True)
 
@@ -33,7 +37,11 @@ class EventPublic(EventBase):
 
 class Event(EventBase, table=True):
     __tablename__ = "events"
+    __table_args__ = (Index("ix_events_date", "date"),)
     id: str = Field(primary_key=True)
+    content_hash: Optional[str] = None
+    # set when an upcoming event disappears from the NFM calendar (e.g. it got cancelled)
+    tombstoned: bool = Field(default=False, sa_column_kwargs={"server_default": "0"})
     compositions: list["Composition"] = Relationship(
         back_populates="events",
         link_model=EventCompositionLink,
@@ -48,6 +56,7 @@ class ComposerBase(SQLModel):
 class Composer(ComposerBase, table=True):
     __tablename__ = "composers"
     id: Optional[int] = Field(default=None, primary_key=True)
+    normalized_name: str = Field(default="", index=True, sa_column_kwargs={"server_default": ""})
     compositions: list["Composition"] = Relationship(back_populates="composer")
 
 
@@ -57,7 +66,9 @@ class CompositionBase(SQLModel):
 
 class Composition(CompositionBase, table=True):
     __tablename__ = "compositions"
+    __table_args__ = (Index("ix_compositions_composer_id_normalized_name", "composer_id", "normalized_name"),)
     id: Optional[int] = Field(default=None, primary_key=True)
+    normalized_name: str = Field(default="", index=True, sa_column_kwargs={"server_default": ""})
     composer_id: int = Field(foreign_key="composers.id")
     composer: Composer = Relationship(back_populates="compositions")
     events: list["Event"] = Relationship(
@@ -82,3 +93,78 @@ class CompositionPublicFull(CompositionPublic):
 
 class ComposerPublicFull(ComposerPublic):
     compositions: list[CompositionPublicFull] = []
+
+
+class CompositionPublicWithComposer(CompositionPublic):
+    composer: ComposerPublic
+
+
+class EventPublicFull(EventPublic):
+    compositions: list[CompositionPublicWithComposer] = []
+
+
+class PerformanceStats(SQLModel):
+    event_count: int = 0
+    first_performance: Optional[date] = None
+    last_performance: Optional[date] = None
+
+
+class CompositionDetail(PerformanceStats, CompositionPublicFull):
+    pass
+
+
+class ComposerDetail(PerformanceStats, ComposerPublic):
+    composition_count: int = 0
+    compositions: list[CompositionDetail] = []
+
+
+class CompositionSummary(PerformanceStats, table=True):
+    """Read model of a composition: its ``CompositionDetail`` as JSON, rebuilt after its events change"""
+
+    __tablename__ = "composition_summaries"
+    composition_id: int = Field(foreign_key="compositions.id", primary_key=True)
+    composer_id: int = Field(foreign_key="composers.id", index=True)
+    payload: str
+
+
+class ComposerSummary(PerformanceStats, table=True):
+    """Read model of a composer: its ``ComposerDetail`` as JSON, rebuilt with the summaries of its compositions"""
+
+    __tablename__ = "composer_summaries"
+    composer_id: int = Field(foreign_key="composers.id", primary_key=True)
+    composition_count: int = 0
+    payload: str
+
+
+class StaleComposition(SQLModel, table=True):
+    """Composition whose events changed since its read models were built, see ``read_models``"""
+
+    __tablename__ = "stale_compositions"
+    composition_id: int = Field(foreign_key="compositions.id", primary_key=True)
+
+
+class BackfillRange(SQLModel, table=True):
+    """Contiguous range of event ids the historical backfill is done with"""
+
+    __tablename__ = "backfill_ranges"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    start_id: int = Field(index=True)
+    end_id: int
+    status: str  # "done" (fetched, saved if it was a valid event) or "not_found" (404)
+
+
+class BackfillFailure(SQLModel, table=True):
+    """Event id the historical backfill failed to scrape, to be retried on the next run"""
+
+    __tablename__ = "backfill_failures"
+    event_id: int = Field(primary_key=True)
+    attempts: int = 1
+    last_error: str = ""
+
+
+class DataVersion(SQLModel, table=True):
+    """Single-row counter bumped by every write of scraped data, stamps cached API responses"""
+
+    __tablename__ = "data_version"
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
@@ -1,13 +1,18 @@
+import argparse
 import asyncio
-from asyncio import Semaphore
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from typing import Type, TypeVar
 
 from bs4 import Tag
+from loguru import logger
 
 from nfmer.db_handler import DatabaseHandler
 from nfmer.models import NFM_Event
+from nfmer.scraper.cache import ResponseCache
 from nfmer.scraper.fetcher import Fetcher, FetcherException
 from nfmer.scraper.parser import Parser
+from nfmer.scraper.pipeline import PipelineStats, ScrapeOutcome, ScrapePipeline, Sink
 
 NFM_URL = "https://www.nfm.wroclaw.pl/en/component/nfmcalendar"
 
@@ -19,16 +24,26 @@ class ScraperException(Exception):
 
 
 class Scraper:
-    def __init__(self, fetcher: Fetcher, parser: Parser, main_url: str, max_concurrent: int = 10):
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        parser: Parser,
+        main_url: str,
+        max_concurrent: int = 10,
+        executor: Executor | None = None,
+    ):
         self.fetcher = fetcher
         self.parser = parser
         self.main_url = main_url
+        self.executor = executor
+        self.max_concurrent = max_concurrent
         self.events_dict: dict[str, str] = {}
-        self.semaphore = Semaphore(max_concurrent)
 
     @classmethod
-    async def initialise(cls: Type[T], fetcher: Fetcher, parser: Parser, main_url: str = NFM_URL) -> T:
-        scraper = cls(fetcher, parser, main_url)
+    async def initialise(
+        cls: Type[T], fetcher: Fetcher, parser: Parser, main_url: str = NFM_URL, executor: Executor | None = None
+    ) -> T:
+        scraper = cls(fetcher, parser, main_url, executor=executor)
         scraper.events_dict = await scraper._populate_events_dict()
         return scraper
 
@@ -53,34 +68,96 @@ class Scraper:
             events_dict[event_id] = event_url
         return events_dict
 
-    async def _process_single_event(self, event_id: str, event_url: str) -> tuple[str, NFM_Event | None]:
-        async with self.semaphore:
-            try:
-                event_soup = await self.fetcher.fetch_soup(event_url)
-                return event_id, self.parser.parse(event_url, event_soup)
-            except FetcherException:
-                return event_id, None
-            except Exception as e:
-                print(f"Skipping {event_id} (URL: {event_url}) due to an error: {e}")
-                return event_id, None
-
-    async def scrape(self) -> dict[str, NFM_Event]:
-        tasks = [self._process_single_event(event_id, event_url) for event_id, event_url in self.events_dict.items()]
-        results = {}
-        for event_id, data in await asyncio.gather(*tasks):
-            if data is not None:
-                results[event_id] = data
+    def _pipeline(self, sink: Sink, known_hashes: dict[str, str | None] | None, batch_size: int) -> ScrapePipeline:
+        return ScrapePipeline(
+            self.fetcher,
+            self.parser,
+            sink,
+            executor=self.executor,
+            known_hashes=known_hashes,
+            fetch_workers=self.max_concurrent,
+            batch_size=batch_size,
+        )
+
+    async def scrape(self, known_hashes: dict[str, str | None] | None = None) -> dict[str, NFM_Event]:
+        """Scrapes all events from the calendar.
+
+        ``known_hashes`` maps already stored event ids to the hash of their page; events whose
+        page hash didn't change are skipped, so only new or modified events are returned.
+        """
+        results: dict[str, NFM_Event] = {}
+
+        def collect(batch: list[ScrapeOutcome]) -> None:
+            results.update({outcome.event_id: outcome.event for outcome in batch if outcome.event is not None})
+
+        await self._pipeline(collect, known_hashes, batch_size=100).run(self.events_dict.items())
         return results
 
-
-async def run_scraper() -> None:
-    fetcher = Fetcher()
-    parser = Parser()
-    scraper = await Scraper.initialise(fetcher, parser)
-    scraped_events = await scraper.scrape()
+    async def scrape_to_db(
+        self,
+        db_handler: DatabaseHandler,
+        known_hashes: dict[str, str | None] | None = None,
+        batch_size: int = 100,
+    ) -> PipelineStats:
+        """Like ``scrape``, but streams the events into the database in batches of ``batch_size``"""
+
+        def save(batch: list[ScrapeOutcome]) -> None:
+            events = {outcome.event_id: outcome.event for outcome in batch if outcome.event is not None}
+            if events:
+                save_stats = db_handler.save_event_data(events)
+                logger.info(f"Saved {save_stats.events} events ({save_stats.rows_per_second:.0f} rows/s)")
+
+        return await self._pipeline(save, known_hashes, batch_size).run(self.events_dict.items())
+
+
+async def run_scraper(
+    cache_dir: str | None = None,
+    offline: bool = False,
+    incremental: bool = False,
+    parse_workers: int | None = None,
+) -> None:
+    """``parse_workers`` is the size of the parsing process pool, None means one per CPU, 0 disables the pool"""
     db_handler = DatabaseHandler()
-    db_handler.save_event_data(scraped_events)
+    known_hashes = db_handler.get_event_hashes() if incremental else None
+    with (
+        ResponseCache(cache_dir) if cache_dir else nullcontext() as cache,
+        ProcessPoolExecutor(parse_workers) if parse_workers != 0 else nullcontext() as executor,
+    ):
+        fetcher = Fetcher(cache=cache, offline=offline)
+        parser = Parser()
+        async with fetcher:
+            scraper = await Scraper.initialise(fetcher, parser, executor=executor)
+            stats = await scraper.scrape_to_db(db_handler, known_hashes)
+    refreshed = db_handler.refresh_read_models()
+    outcomes = ", ".join(f"{status.value}: {count}" for status, count in stats.outcomes.items())
+    logger.info(f"Scraping finished: {outcomes}, {refreshed} composition details rebuilt")
+    logger.info(f"Requests: {fetcher.retry_policy.stats.summary()}")
+    if not scraper.events_dict:
+        logger.warning("The calendar listed no events, not tombstoning anything")
+        return
+    db_handler.restore_listed_events(scraper.events_dict)
+    db_handler.tombstone_missing_events(scraper.events_dict)
 
 
 def main() -> None:
-    asyncio.run(run_scraper())
+    arg_parser = argparse.ArgumentParser(description="Scrape the NFM calendar into the local database")
+    arg_parser.add_argument("--cache-dir", help="directory of the on-disk HTTP response cache")
+    arg_parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="don't touch the network, replay every page from --cache-dir",
+    )
+    arg_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only save events that are new or whose page changed since the last run",
+    )
+    arg_parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="number of processes parsing the pages (default: one per CPU, 0: parse on the event loop)",
+    )
+    args = arg_parser.parse_args()
+    if args.offline and not args.cache_dir:
+        arg_parser.error("--offline requires --cache-dir")
+    asyncio.run(run_scraper(args.cache_dir, args.offline, args.incremental, args.parse_workers))
@@ -0,0 +1,109 @@
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Iterator, Self
+
+CACHE_FILENAME = "http_cache.sqlite"
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes of stored bodies
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class ResponseCache:
+    """On-disk store of response bodies and their validators (ETag / Last-Modified).
+
+    Backed by a single SQLite file inside ``cache_dir``. Once the stored bodies exceed
+    ``max_size`` bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._conn = sqlite3.connect(self.cache_dir / CACHE_FILENAME)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, url: str) -> CachedResponse | None:
+        row = self._conn.execute(
+            "SELECT content, etag, last_modified FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        self._conn.commit()
+        return CachedResponse(url=url, content=row[0], etag=row[1], last_modified=row[2])
+
+    def put(self, url: str, content: bytes, etag: str | None = None, last_modified: str | None = None) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO responses (url, etag, last_modified, content, size, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content = excluded.content,
+                size = excluded.size,
+                accessed_at = excluded.accessed_at
+            """,
+            (url, etag, last_modified, content, len(content), time.time()),
+        )
+        self._evict()
+        self._conn.commit()
+
+    def items(self) -> Iterator[CachedResponse]:
+        for url, content, etag, last_modified in self._conn.execute(
+            "SELECT url, content, etag, last_modified FROM responses ORDER BY url"
+        ):
+            yield CachedResponse(url=url, content=content, etag=etag, last_modified=last_modified)
+
+    def total_size(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return int(total)
+
+    def _evict(self) -> None:
+        excess = self.total_size() - self.max_size
+        if excess <= 0:
+            return
+        evicted: list[tuple[str]] = []
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            if excess <= 0:
+                break
+            evicted.append((url,))
+            excess -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
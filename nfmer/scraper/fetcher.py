@@ -1,8 +1,17 @@
-import asyncio
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Self
 
 import httpx
 from bs4 import BeautifulSoup
-from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_fixed
+
+from nfmer.scraper.cache import CachedResponse, ResponseCache
+from nfmer.scraper.parser import make_soup
+from nfmer.scraper.rate_limiter import RateLimiter
+from nfmer.scraper.retry import RetryPolicy
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30)
+DEFAULT_TIMEOUT = httpx.Timeout(10)
 
 
 class FetcherException(Exception):
@@ -13,26 +22,107 @@ class FetcherException(Exception):
         super().__init__(message)
 
 
+@dataclass
+class FetchResult:
+    url: str
+    content: bytes
+    not_modified: bool = False  # server answered 304, content comes from the cache
+
+
 class Fetcher:
-    """Takes an URL and returns a BeautifulSoup for further parsing"""
-
-    @retry(
-        retry=retry_if_not_exception_type(FetcherException),
-        reraise=True,
-        stop=stop_after_attempt(3),
-        wait=wait_fixed(2),
-    )
+    """Takes an URL and returns a BeautifulSoup for further parsing.
+
+    A single ``httpx.AsyncClient`` is kept open for the lifetime of the fetcher, so connections
+    to the same host are pooled and reused between requests. Use it as an async context manager
+    to make sure the pool is closed; the client is also opened lazily on the first fetch.
+    Every request first waits for a token from the (per-host, adaptive) rate limiter; failed
+    requests are retried by ``retry_policy``, shared by all the requests of this fetcher.
+
+    With a ``cache``, responses are stored on disk and revalidated with conditional requests;
+    in ``offline`` mode nothing is sent and every page is replayed from the cache.
+    """
+
+    def __init__(
+        self,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        http2: bool = True,
+        rate_limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        offline: bool = False,
+        retry_policy: RetryPolicy | None = None,
+    ):
+        if offline and cache is None:
+            raise ValueError("Offline mode requires a response cache")
+        self.limits = limits
+        self.timeout = timeout
+        self.http2 = http2
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.cache = cache
+        self.offline = offline
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self) -> Self:
+        self._get_client()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _fetch_offline(self, url: str) -> FetchResult:
+        assert self.cache is not None
+        cached = self.cache.get(url)
+        if cached is None:
+            raise FetcherException(f"Offline mode: {url} is not cached", "GET")
+        return FetchResult(url, cached.content)
+
+    async def _fetch_online(self, url: str, cached: CachedResponse | None) -> FetchResult:
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        response = await self._get_client().get(url, headers=headers)
+        self.rate_limiter.record(url, response.status_code)
+        if response.status_code == 304 and cached:
+            return FetchResult(url, cached.content, not_modified=True)
+        response.raise_for_status()
+        if self.cache:
+            self.cache.put(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return FetchResult(url, response.content)
+
+    async def fetch(self, url: str) -> FetchResult:
+        if self.offline:
+            return self._fetch_offline(url)
+        cached = self.cache.get(url) if self.cache else None
+        try:
+            return await self.retry_policy.call(
+                lambda: self._fetch_online(url, cached), throttle=lambda: self.rate_limiter.acquire(url)
+            )
+        except httpx.HTTPStatusError as e:
+            msg = (
+                f"Error response. "
+                f"URL: {e.request.url}, method: {e.request.method}, "
+                f"status: {e.response.status_code}, message: {e.response.text}"
+            )
+            raise FetcherException(msg, e.request.method, e.response.status_code)
+
     async def fetch_soup(self, url: str) -> BeautifulSoup:
-        async with httpx.AsyncClient() as client:
-            try:
-                await asyncio.sleep(1)  # pseudo rate-limiting
-                response = await client.get(url, timeout=10)
-                response.raise_for_status()
-                return BeautifulSoup(response.content, "html.parser")
-            except httpx.HTTPStatusError as e:
-                msg = (
-                    f"Error response. "
-                    f"URL: {e.request.url}, method: {e.request.method}, "
-                    f"status: {e.response.status_code}, message: {e.response.text}"
-                )
-                raise FetcherException(msg, e.request.method, e.response.status_code)
+        result = await self.fetch(url)
+        return make_soup(result.content)
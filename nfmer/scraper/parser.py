@@ -1,17 +1,43 @@
+import re
 from datetime import date, datetime
+from functools import cache
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, FeatureNotFound, Tag
 from bs4.element import NavigableString
+from bs4.filter import SoupStrainer
 
 from nfmer.models import NFM_Event
 
 PLACEHOLDER_DATE = date(9999, 12, 31)
+PARSER_BACKENDS = ("lxml", "html.parser")
+# Only the divs Parser reads from are turned into a tree, the rest of the page is skipped
+EVENT_PAGE_STRAINER = SoupStrainer("div", class_=re.compile(r"\b(nfmEDDate|nfmEDTime|nfmEDLoc|nfmArtAddInfo)\b"))
+
+
+@cache
+def default_backend() -> str:
+    """The fastest tree builder available: lxml (C based) if installed, html.parser otherwise"""
+    try:
+        BeautifulSoup("", "lxml")
+    except FeatureNotFound:
+        return "html.parser"
+    return "lxml"
+
+
+def make_soup(
+    content: bytes | str, backend: str | None = None, parse_only: SoupStrainer | None = None
+) -> BeautifulSoup:
+    return BeautifulSoup(content, backend or default_backend(), parse_only=parse_only)
 
 
 class Parser:
     """Processes HTML soup of a given event, and returns filtered data"""
 
-    def __init__(self) -> None:
+    def __init__(self, backend: str | None = None, strain: bool = True) -> None:
+        if backend is not None and backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend {backend!r}, expected one of {PARSER_BACKENDS}")
+        self.backend = backend or default_backend()
+        self.strain = strain
         self.soup: BeautifulSoup | None = None
 
     def _cleanup_programme(self, programme_dict: dict[str, str]) -> dict[str, str]:
@@ -128,6 +154,10 @@ class Parser:
         programme = self._format_programme_section(programme_p)
         return programme
 
+    def parse_content(self, url: str, content: bytes) -> NFM_Event | None:
+        parse_only = EVENT_PAGE_STRAINER if self.strain else None
+        return self.parse(url, make_soup(content, self.backend, parse_only))
+
     def parse(self, url: str, soup: BeautifulSoup) -> NFM_Event | None:
         self.soup = soup
         programme = self._retrieve_event_programme()
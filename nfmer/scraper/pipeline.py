@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Iterable
+
+from loguru import logger
+
+from nfmer.models import NFM_Event
+from nfmer.scraper.fetcher import Fetcher, FetcherException, FetchResult
+from nfmer.scraper.parser import Parser
+
+
+class OutcomeStatus(str, Enum):
+    PARSED = "parsed"
+    UNCHANGED = "unchanged"
+    NOT_FOUND = "not_found"
+    FAILED = "failed"
+
+
+@dataclass
+class ScrapeOutcome:
+    event_id: str
+    status: OutcomeStatus
+    event: NFM_Event | None = None
+    error: str = ""
+
+
+@dataclass
+class FetchedPage:
+    event_id: str
+    url: str
+    content: bytes
+    content_hash: str
+
+
+@dataclass
+class PipelineStats:
+    outcomes: Counter[OutcomeStatus] = field(default_factory=Counter)
+    batches_written: int = 0
+
+    @property
+    def events_saved(self) -> int:
+        return self.outcomes[OutcomeStatus.PARSED]
+
+
+Sink = Callable[[list[ScrapeOutcome]], None]
+
+_DONE = None  # end-of-stream marker passed through the queues
+
+
+async def parse_in_executor(executor: Executor | None, parser: Parser, url: str, content: bytes) -> NFM_Event | None:
+    """Runs the CPU-bound parsing in ``executor`` (e.g. a process pool), or on the event loop if it's None"""
+    if executor is None:
+        return parser.parse_content(url, content)
+    return await asyncio.get_running_loop().run_in_executor(executor, parser.parse_content, url, content)
+
+
+class ScrapePipeline:
+    """Fetch stage -> parse stage -> batched writer, connected by bounded queues.
+
+    Every job ends up as exactly one ``ScrapeOutcome``; the writer hands them to ``sink`` in
+    batches of ``batch_size`` (in a worker thread, so DB writes overlap with network I/O).
+    Full queues make the upstream stages wait, so memory use doesn't depend on the number of jobs.
+    Pages in ``prefetched`` (by URL, e.g. downloaded while probing) are used once instead of fetched.
+    """
+
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        parser: Parser,
+        sink: Sink,
+        executor: Executor | None = None,
+        known_hashes: dict[str, str | None] | None = None,
+        prefetched: dict[str, FetchResult] | None = None,
+        fetch_workers: int = 10,
+        parse_workers: int | None = None,
+        queue_size: int = 100,
+        batch_size: int = 100,
+    ):
+        self.fetcher = fetcher
+        self.parser = parser
+        self.sink = sink
+        self.executor = executor
+        self.known_hashes = known_hashes or {}
+        self.prefetched = prefetched if prefetched is not None else {}
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.stats = PipelineStats()
+
+    async def _fetch(self, event_id: str, url: str) -> FetchedPage | ScrapeOutcome:
+        try:
+            result = self.prefetched.pop(url, None) or await self.fetcher.fetch(url)
+        except FetcherException as e:
+            status = OutcomeStatus.NOT_FOUND if e.error_code == 404 else OutcomeStatus.FAILED
+            return ScrapeOutcome(event_id, status, error=e.message)
+        except Exception as e:
+            logger.warning(f"Skipping {event_id} (URL: {url}) due to an error: {e}")
+            return ScrapeOutcome(event_id, OutcomeStatus.FAILED, error=str(e))
+        # A 304 only says the page matches the HTTP cache, which is written before the page is saved;
+        # the page is skipped only if the database already holds it (a failed save leaves no hash)
+        content_hash = hashlib.sha256(result.content).hexdigest()
+        if content_hash == self.known_hashes.get(event_id):
+            return ScrapeOutcome(event_id, OutcomeStatus.UNCHANGED)
+        return FetchedPage(event_id, url, result.content, content_hash)
+
+    async def _parse(self, page: FetchedPage) -> ScrapeOutcome:
+        try:
+            event = await parse_in_executor(self.executor, self.parser, page.url, page.content)
+        except Exception as e:
+            logger.warning(f"Skipping {page.event_id} (URL: {page.url}) due to an error: {e}")
+            return ScrapeOutcome(page.event_id, OutcomeStatus.FAILED, error=str(e))
+        if event is None:
+            return ScrapeOutcome(page.event_id, OutcomeStatus.FAILED, error="nothing to parse")
+        event.content_hash = page.content_hash
+        return ScrapeOutcome(page.event_id, OutcomeStatus.PARSED, event)
+
+    async def _produce(self, jobs: Iterable[tuple[str, str]], job_queue: asyncio.Queue[tuple[str, str] | None]) -> None:
+        for job in jobs:
+            await job_queue.put(job)
+        for _ in range(self.fetch_workers):
+            await job_queue.put(_DONE)
+
+    async def _fetch_worker(
+        self,
+        job_queue: asyncio.Queue[tuple[str, str] | None],
+        page_queue: asyncio.Queue[FetchedPage | None],
+        outcome_queue: asyncio.Queue[ScrapeOutcome | None],
+    ) -> None:
+        while (job := await job_queue.get()) is not _DONE:
+            fetched = await self._fetch(*job)
+            if isinstance(fetched, FetchedPage):
+                await page_queue.put(fetched)
+            else:
+                await outcome_queue.put(fetched)
+
+    async def _parse_worker(
+        self,
+        page_queue: asyncio.Queue[FetchedPage | None],
+        outcome_queue: asyncio.Queue[ScrapeOutcome | None],
+    ) -> None:
+        while (page := await page_queue.get()) is not _DONE:
+            await outcome_queue.put(await self._parse(page))
+
+    async def _write(self, outcome_queue: asyncio.Queue[ScrapeOutcome | None]) -> None:
+        batch: list[ScrapeOutcome] = []
+        while (outcome := await outcome_queue.get()) is not _DONE:
+            batch.append(outcome)
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[ScrapeOutcome]) -> None:
+        await asyncio.to_thread(self.sink, batch)
+        self.stats.outcomes.update(outcome.status for outcome in batch)
+        self.stats.batches_written += 1
+
+    async def run(self, jobs: Iterable[tuple[str, str]]) -> PipelineStats:
+        """Scrapes ``(event_id, url)`` jobs until they are exhausted, returns the outcome counts"""
+        job_queue: asyncio.Queue[tuple[str, str] | None] = asyncio.Queue(self.queue_size)
+        page_queue: asyncio.Queue[FetchedPage | None] = asyncio.Queue(self.queue_size)
+        outcome_queue: asyncio.Queue[ScrapeOutcome | None] = asyncio.Queue(self.queue_size)
+
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(self._produce(jobs, job_queue))
+            writer = task_group.create_task(self._write(outcome_queue))
+            async with asyncio.TaskGroup() as parse_group:
+                async with asyncio.TaskGroup() as fetch_group:
+                    for _ in range(self.fetch_workers):
+                        fetch_group.create_task(self._fetch_worker(job_queue, page_queue, outcome_queue))
+                    for _ in range(self.parse_workers):
+                        parse_group.create_task(self._parse_worker(page_queue, outcome_queue))
+                # all pages are queued once the fetchers are done, let the parsers drain the queue
+                for _ in range(self.parse_workers):
+                    await page_queue.put(_DONE)
+            await outcome_queue.put(_DONE)
+            await writer
+        return self.stats
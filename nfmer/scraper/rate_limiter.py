@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Callable
+
+import httpx
+
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second are added, up to ``burst`` tokens"""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("TokenBucket needs a positive rate and a burst of at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(float(self.burst), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()  # settle the tokens earned at the old rate first
+        self.rate = rate
+
+    async def acquire(self) -> None:
+        # The lock keeps waiters in FIFO order, so nobody starves while others keep refilling
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Per-host token buckets with adaptive (AIMD) rate control.
+
+    Every throttling response (429/503) multiplies the host rate by ``backoff_factor``, every
+    healthy response adds ``recovery_step`` back, bounded by ``min_rate`` and ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 10,
+        min_rate: float = 0.5,
+        max_rate: float = 20.0,
+        backoff_factor: float = 0.5,
+        recovery_step: float = 0.5,
+    ):
+        if not min_rate <= rate <= max_rate:
+            raise ValueError("Expected min_rate <= rate <= max_rate")
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = httpx.URL(url).host
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def current_rate(self, url: str) -> float:
+        return self._bucket(url).rate
+
+    async def acquire(self, url: str) -> None:
+        await self._bucket(url).acquire()
+
+    def record(self, url: str, status_code: int) -> None:
+        bucket = self._bucket(url)
+        if status_code in THROTTLE_STATUS_CODES:
+            new_rate = max(self.min_rate, bucket.rate * self.backoff_factor)
+        elif status_code < 500:
+            new_rate = min(self.max_rate, bucket.rate + self.recovery_step)
+        else:
+            return
+        bucket.set_rate(new_rate)
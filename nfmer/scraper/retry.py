@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """Seconds to wait according to a ``Retry-After`` header (delay in seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+@dataclass
+class RetryStats:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0  # calls that gave up
+    budget_exhausted: int = 0
+    circuit_opened: int = 0
+    fetch_seconds: float = 0.0
+    backoff_seconds: float = 0.0
+    circuit_seconds: float = 0.0
+    throttle_seconds: float = 0.0
+
+    @property
+    def wait_seconds(self) -> float:
+        return self.backoff_seconds + self.circuit_seconds + self.throttle_seconds
+
+    def summary(self) -> str:
+        return (
+            f"{self.attempts} attempts for {self.calls} calls ({self.retries} retries, {self.failures} gave up), "
+            f"{self.fetch_seconds:.1f}s fetching, {self.wait_seconds:.1f}s waiting "
+            f"({self.throttle_seconds:.1f}s for the rate limiter, circuit opened {self.circuit_opened} times)"
+        )
+
+
+class RetryPolicy:
+    """Retries shared by every concurrent call of a scraper.
+
+    * a failed attempt waits a random time up to ``base_delay * 2 ** attempt`` (full jitter,
+      capped at ``max_delay``), or what the server asked for in ``Retry-After``;
+    * retries are limited by a budget: at most ``min_retries`` plus ``retry_ratio`` of all calls
+      made so far, so a failing site doesn't multiply the traffic;
+    * ``failure_threshold`` retryable failures in a row open the circuit: every call waits
+      ``reset_timeout`` seconds before trying again, one more failure reopens it.
+
+    Only transport errors and ``HTTPStatusError`` with a status in ``RETRYABLE_STATUS_CODES`` are
+    retried, everything else (e.g. a 404) is raised at once.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        retry_ratio: float = 0.2,
+        min_retries: int = 10,
+        failure_threshold: int = 10,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        jitter: Callable[[float, float], float] = random.uniform,
+    ):
+        if max_attempts < 1:
+            raise ValueError("RetryPolicy needs at least one attempt")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_ratio = retry_ratio
+        self.min_retries = min_retries
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self.stats = RetryStats()
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+
+    def backoff(self, attempt: int, error: Exception | None = None) -> float:
+        """Delay before retry number ``attempt`` (starting at 1) after ``error``"""
+        retry_after = None
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self._jitter(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._clock() < self._open_until
+
+    def _has_budget(self) -> bool:
+        return self.stats.retries < self.min_retries + self.retry_ratio * self.stats.calls
+
+    def _record_success(self) -> None:
+        self._consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.failure_threshold and not self.circuit_open:
+            self._open_until = self._clock() + self.reset_timeout
+            self.stats.circuit_opened += 1
+
+    async def _wait_for_circuit(self) -> None:
+        while (remaining := self._open_until - self._clock()) > 0:
+            self.stats.circuit_seconds += remaining
+            await self._sleep(remaining)
+
+    async def call(
+        self, function: Callable[[], Awaitable[T]], throttle: Callable[[], Awaitable[None]] | None = None
+    ) -> T:
+        """Awaits ``function()`` until it succeeds, fails for good or runs out of attempts/budget.
+
+        ``throttle()`` (e.g. taking a rate limiter token) is awaited before every attempt, the time
+        it takes counts as waiting, not as fetching.
+        """
+        self.stats.calls += 1
+        attempt = 1
+        while True:
+            await self._wait_for_circuit()
+            if throttle is not None:
+                throttled = self._clock()
+                await throttle()
+                self.stats.throttle_seconds += self._clock() - throttled
+            self.stats.attempts += 1
+            started = self._clock()
+            try:
+                result = await function()
+            except Exception as e:
+                self.stats.fetch_seconds += self._clock() - started
+                if not self.is_retryable(e):
+                    self._record_success()  # the site answered, it just didn't like the request
+                    raise
+                self._record_failure()
+                if attempt >= self.max_attempts or not self._has_budget():
+                    self.stats.budget_exhausted += attempt < self.max_attempts
+                    self.stats.failures += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                self.stats.retries += 1
+                self.stats.backoff_seconds += delay
+                await self._sleep(delay)
+                attempt += 1
+                continue
+            self.stats.fetch_seconds += self._clock() - started
+            self._record_success()
+            return result
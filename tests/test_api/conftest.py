@@ -0,0 +1,24 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from nfmer.api.settings import get_settings
+from nfmer.api.v1.response_cache import response_cache
+
+
+@pytest.fixture
+def db_url(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    """Points the API (started with ``with TestClient(api)``) at an empty database in ``tmp_path``"""
+    db_url = f"sqlite:///{tmp_path}/api.db"
+    monkeypatch.setenv("NFMER_DB_URL", db_url)
+    get_settings.cache_clear()
+    yield db_url
+    get_settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache() -> Iterator[None]:
+    response_cache.clear()
+    yield
+    response_cache.clear()
@@ -1,10 +1,13 @@
+from unittest.mock import MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
 from nfmer.api.v1.api import api
-from nfmer.models import Composer, Composition
-from nfmer.db_handler import DatabaseHandler, get_db
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Composer, ComposerDetail, CompositionDetail
 
 client = TestClient(api)
 
@@ -13,33 +16,33 @@ mock_composers = [
     Composer(id=2, composer_name="Wolfgang Amadeus Mozart", compositions=[]),
 ]
 
-mock_compositions = [
-    Composition(id=1, composition_name="Brandenburg Concerto No. 3", composer_id=1),
-    Composition(id=2, composition_name="Symphony No. 40", composer_id=2),
-]
+bach_detail = ComposerDetail(
+    id=1,
+    composer_name="Johann Sebastian Bach",
+    composition_count=1,
+    compositions=[
+        CompositionDetail(
+            id=1,
+            composition_name="Brandenburg Concerto No. 3",
+            composer={"id": 1, "composer_name": "Johann Sebastian Bach"},
+            events=[],
+        )
+    ],
+)
 
 
 @pytest.fixture
 def mock_db(mocker: MockerFixture):
-    db = mocker.MagicMock(spec=DatabaseHandler)
+    db = mocker.MagicMock(spec=AsyncDatabaseHandler)
     db.get_all_composers.return_value = mock_composers
     db.search_composers_by_name.return_value = [mock_composers[0]]
-    bach_with_compositions = Composer(
-        id=1,
-        composer_name="Johann Sebastian Bach",
-        compositions=[mock_compositions[0]]
-    )
-    db.get_composer_by_id.side_effect = lambda id: (
-        bach_with_compositions if id == 1
-        else mock_composers[1] if id == 2
-        else None
-    )
+    db.get_composer_detail.side_effect = lambda id: bach_detail.model_dump_json() if id == 1 else None
     return db
 
 
 @pytest.fixture(autouse=True)
 def override_dependency(mock_db):
-    api.dependency_overrides[get_db] = lambda: mock_db
+    api.dependency_overrides[get_async_db] = lambda: mock_db
     yield
     api.dependency_overrides = {}
 
@@ -67,6 +70,7 @@ def test_get_composer_by_id():
     data = response.json()
     assert data["composer_name"] == "Johann Sebastian Bach"
     assert "compositions" in data
+    assert data["composition_count"] == 1
     assert len(data["compositions"]) == 1
     assert data["compositions"][0]["composition_name"] == "Brandenburg Concerto No. 3"
 
@@ -75,3 +79,25 @@ def test_get_composer_not_found():
     response = client.get("/composers/999")  # ID that doesn't exist
     assert response.status_code == 404
     assert response.json()["detail"] == "Composer not found"
+
+
+def test_get_composer_is_cached_until_data_changes(mock_db: MagicMock) -> None:
+    mock_db.get_data_version.return_value = 1
+    first = client.get("/composers/1")
+    etag = first.headers["etag"]
+    revalidated = client.get("/composers/1", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/composers/1").json() == first.json()
+    mock_db.get_composer_detail.assert_awaited_once_with(1)
+    mock_db.get_data_version.return_value = 2
+    assert client.get("/composers/1", headers={"If-None-Match": etag}).status_code == 304  # same content
+    assert mock_db.get_composer_detail.await_count == 2
+
+
+def test_search_composers_is_cached_per_query(mock_db: MagicMock) -> None:
+    mock_db.get_data_version.return_value = 1
+    client.get("/composers/?search=Bach")
+    client.get("/composers/?search=Bach")
+    client.get("/composers/?search=Mozart")
+    assert mock_db.search_composers_by_name.await_count == 2
@@ -3,8 +3,9 @@ from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
 from nfmer.api.v1.api import api
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Composer, Composition, Event
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Composer, Composition, CompositionDetail, Event, EventPublic
 
 client = TestClient(api)
 
@@ -23,29 +24,29 @@ mock_compositions = [
     Composition(id=2, composition_name="Symphony No. 40", composer_id=2, composer=mock_composers[1]),
 ]
 
-mock_composition_full = Composition(
+mock_composition_detail = CompositionDetail(
     id=1,
     composition_name="Brandenburg Concerto No. 3",
-    composer_id=1,
-    composer=mock_composers[0],
-    events=[mock_events[0]],
+    composer={"id": 1, "composer_name": "Johann Sebastian Bach"},
+    events=[EventPublic.model_validate(mock_events[0], from_attributes=True)],
+    event_count=1,
+    first_performance="2024-03-15",
+    last_performance="2024-03-15",
 )
 
 
 @pytest.fixture
-def mock_db(mocker: MockerFixture) -> DatabaseHandler:
-    db = mocker.MagicMock(spec=DatabaseHandler)
+def mock_db(mocker: MockerFixture) -> AsyncDatabaseHandler:
+    db = mocker.MagicMock(spec=AsyncDatabaseHandler)
     db.get_all_compositions.return_value = mock_compositions
     db.search_compositions_by_name.return_value = [mock_compositions[0]]
-    db.get_composition_by_id.side_effect = lambda id: (
-        mock_composition_full if id == 1 else mock_compositions[1] if id == 2 else None
-    )
+    db.get_composition_detail.side_effect = lambda id: mock_composition_detail.model_dump_json() if id == 1 else None
     return db
 
 
 @pytest.fixture(autouse=True)
-def override_dependency(mock_db: DatabaseHandler) -> None:
-    api.dependency_overrides[get_db] = lambda: mock_db
+def override_dependency(mock_db: AsyncDatabaseHandler) -> None:
+    api.dependency_overrides[get_async_db] = lambda: mock_db
     yield
     api.dependency_overrides = {}
 
@@ -77,6 +78,8 @@ def test_get_composition_by_id() -> None:
     assert "events" in data
     assert len(data["events"]) == 1
     assert data["events"][0]["location"] == "Concert Hall"
+    assert data["event_count"] == 1
+    assert data["first_performance"] == "2024-03-15"
 
 
 def test_get_composition_not_found() -> None:
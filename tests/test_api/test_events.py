@@ -1,10 +1,13 @@
+from datetime import date
+
 import pytest
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
 from nfmer.api.v1.api import api
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Event
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import Composer, Composition, Event
 
 client = TestClient(api)
 
@@ -26,21 +29,33 @@ mock_events = [
 ]
 
 
+mock_events[1].compositions = [
+    Composition(
+        id=1,
+        composition_name="Symphony No. 40",
+        composer_id=1,
+        composer=Composer(id=1, composer_name="Wolfgang Amadeus Mozart"),
+    )
+]
+
+
 @pytest.fixture
-def mock_db(mocker: MockerFixture) -> DatabaseHandler:
-    db = mocker.MagicMock(spec=DatabaseHandler)
+def mock_db(mocker: MockerFixture) -> AsyncDatabaseHandler:
+    db = mocker.MagicMock(spec=AsyncDatabaseHandler)
     db.get_all_events.return_value = [event.id for event in mock_events]
     db.get_event_by_id.side_effect = lambda id: (
         mock_events[0] if id == "20240315-1900-concert-hall"
         else mock_events[1] if id == "20240420-2000-opera-house"
         else None
     )
+    db.get_upcoming_events.return_value = [mock_events[1]]
+    db.get_events_between.return_value = mock_events
     return db
 
 
 @pytest.fixture(autouse=True)
-def override_dependency(mock_db: DatabaseHandler) -> None:
-    api.dependency_overrides[get_db] = lambda: mock_db
+def override_dependency(mock_db: AsyncDatabaseHandler) -> None:
+    api.dependency_overrides[get_async_db] = lambda: mock_db
     yield
     api.dependency_overrides = {}
 
@@ -69,3 +84,56 @@ def test_get_event_not_found() -> None:
     response = client.get("/events/non-existent-event")
     assert response.status_code == 404
     assert response.json()["detail"] == "Event not found"
+
+
+def test_get_events_links_next_page(mock_db: AsyncDatabaseHandler) -> None:
+    response = client.get("/events/?limit=1")
+    assert response.status_code == 200
+    assert response.json() == ["20240315-1900-concert-hall"]
+    mock_db.get_all_events.assert_awaited_once_with(2, None)  # type: ignore[attr-defined]
+    assert response.links["next"]["url"] == "http://testserver/events/?limit=1&after=20240315-1900-concert-hall"
+
+
+def test_get_events_last_page_has_no_link() -> None:
+    response = client.get("/events/?limit=2&after=20240301-1900-concert-hall")
+    assert len(response.json()) == 2
+    assert "link" not in response.headers
+
+
+def test_get_events_rejects_too_large_pages() -> None:
+    response = client.get("/events/?limit=100000")
+    assert response.status_code == 422
+
+
+def test_get_event_has_programme() -> None:
+    data = client.get("/events/20240420-2000-opera-house").json()
+    mozart = {"composer_name": "Wolfgang Amadeus Mozart", "id": 1}
+    assert data["compositions"] == [{"composition_name": "Symphony No. 40", "id": 1, "composer": mozart}]
+
+
+def test_get_upcoming_events(mock_db: AsyncDatabaseHandler) -> None:
+    response = client.get("/events/upcoming?limit=5&composer_id=1&location=Opera House")
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json()] == ["20240420-2000-opera-house"]
+    assert response.json()[0]["compositions"][0]["composer"]["composer_name"] == "Wolfgang Amadeus Mozart"
+    mock_db.get_upcoming_events.assert_awaited_once_with(  # type: ignore[attr-defined]
+        5, composer_id=1, composition_id=None, location="Opera House"
+    )
+
+
+def test_get_calendar_links_next_page(mock_db: AsyncDatabaseHandler) -> None:
+    response = client.get("/events/calendar?start=2024-03-01&end=2024-05-01&composition_id=1&limit=1")
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json()] == ["20240315-1900-concert-hall"]
+    mock_db.get_events_between.assert_awaited_once_with(  # type: ignore[attr-defined]
+        date(2024, 3, 1), date(2024, 5, 1), composer_id=None, composition_id=1, location=None, limit=2, after=None
+    )
+    assert response.links["next"]["url"] == (
+        "http://testserver/events/calendar?start=2024-03-01&end=2024-05-01&composition_id=1"
+        "&limit=1&after=20240315-1900-concert-hall"
+    )
+
+
+def test_get_calendar_validates_the_range() -> None:
+    assert client.get("/events/calendar").status_code == 422
+    assert client.get("/events/calendar?start=2024-05-01&end=2024-03-01").status_code == 422
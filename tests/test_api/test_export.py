@@ -0,0 +1,53 @@
+import json
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from nfmer.api.v1.api import api
+from nfmer.db_handler import DatabaseHandler
+from nfmer.models import NFM_Event
+
+
+def save_events(db_url: str) -> None:
+    DatabaseHandler(db_url).save_event_data(
+        {
+            "1": NFM_Event(
+                url="https://example.com/event/1",
+                event_programme={"Johann Sebastian Bach": "Brandenburg Concerto No. 3"},
+                location="Concert Hall",
+                date=date(2024, 3, 15),
+                hour="19:00",
+            )
+        }
+    )
+
+
+def test_export_streams_ndjson(db_url: str) -> None:
+    save_events(db_url)
+    with TestClient(api) as client:
+        response = client.get("/export/events")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {
+            "id": "1",
+            "date": "2024-03-15",
+            "hour": "19:00",
+            "location": "Concert Hall",
+            "url": "https://example.com/event/1",
+            "tombstoned": False,
+        }
+    ]
+
+
+def test_export_streams_csv(db_url: str) -> None:
+    save_events(db_url)
+    with TestClient(api) as client:
+        response = client.get("/export/links?format=csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="links.csv"'
+    assert response.text.splitlines() == ["event_id,composition_id", "1,1"]
+
+
+def test_export_unknown_table(db_url: str) -> None:
+    with TestClient(api) as client:
+        assert client.get("/export/backfill_ranges").status_code == 422
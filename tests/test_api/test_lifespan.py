@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from nfmer.api.v1.api import api
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+
+
+def test_lifespan_creates_one_handler_for_all_requests(db_url: str, tmp_path: Path) -> None:
+    with TestClient(api) as client:
+        db = api.state.db
+        assert client.get("/composers/").json() == []
+        assert client.get("/composers/1").status_code == 404
+        assert api.state.db is db
+    assert (tmp_path / "api.db").exists()
+
+
+def test_get_async_db_returns_shared_handler(mocker: MockerFixture) -> None:
+    request = mocker.Mock()
+    request.app.state.db = AsyncDatabaseHandler("sqlite:///:memory:")
+    assert get_async_db(request) is request.app.state.db
+    assert request.app.state.db.engine.url.drivername == "sqlite+aiosqlite"
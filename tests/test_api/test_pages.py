@@ -1,10 +1,20 @@
+from unittest.mock import MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
 from nfmer.api.v1.api import api
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import Composer, Composition, Event
+from nfmer.api.v1.deps import get_async_db
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import (
+    Composer,
+    ComposerDetail,
+    Composition,
+    CompositionDetail,
+    Event,
+    EventPublic,
+)
 
 client = TestClient(api)
 
@@ -22,38 +32,40 @@ mock_compositions = [
     Composition(id=2, composition_name="Symphony No. 40", composer_id=2, composer=mock_composers[1]),
 ]
 
-mock_composer_full = Composer(
+mock_composition_detail = CompositionDetail(
     id=1,
-    composer_name="Johann Sebastian Bach",
-    compositions=[mock_compositions[0]],
+    composition_name="Brandenburg Concerto No. 3",
+    composer={"id": 1, "composer_name": "Johann Sebastian Bach"},
+    events=[EventPublic.model_validate(mock_events[0], from_attributes=True)],
+    event_count=1,
+    first_performance="2024-03-15",
+    last_performance="2024-03-15",
 )
 
-mock_composition_full = Composition(
+mock_composer_detail = ComposerDetail(
     id=1,
-    composition_name="Brandenburg Concerto No. 3",
-    composer_id=1,
-    composer=mock_composers[0],
-    events=[mock_events[0]],
+    composer_name="Johann Sebastian Bach",
+    compositions=[mock_composition_detail],
+    composition_count=1,
+    event_count=1,
+    first_performance="2024-03-15",
+    last_performance="2024-03-15",
 )
 
 
 @pytest.fixture
-def mock_db(mocker: MockerFixture) -> DatabaseHandler:
-    db = mocker.MagicMock(spec=DatabaseHandler)
+def mock_db(mocker: MockerFixture) -> AsyncDatabaseHandler:
+    db = mocker.MagicMock(spec=AsyncDatabaseHandler)
     db.search_composers_by_name.return_value = [mock_composers[0]]
     db.search_compositions_by_name.return_value = [mock_compositions[0]]
-    db.get_composer_by_id.side_effect = lambda id: (
-        mock_composer_full if id == 1 else None
-    )
-    db.get_composition_by_id.side_effect = lambda id: (
-        mock_composition_full if id == 1 else None
-    )
+    db.get_composer_detail.side_effect = lambda id: mock_composer_detail.model_dump_json() if id == 1 else None
+    db.get_composition_detail.side_effect = lambda id: mock_composition_detail.model_dump_json() if id == 1 else None
     return db
 
 
 @pytest.fixture(autouse=True)
-def override_dependency(mock_db: DatabaseHandler) -> None:
-    api.dependency_overrides[get_db] = lambda: mock_db
+def override_dependency(mock_db: AsyncDatabaseHandler) -> None:
+    api.dependency_overrides[get_async_db] = lambda: mock_db
     yield
     api.dependency_overrides = {}
 
@@ -108,6 +120,7 @@ def test_composition_detail_page() -> None:
     assert "Brandenburg Concerto No. 3" in response.text
     assert "Johann Sebastian Bach" in response.text
     assert "Concert Hall" in response.text
+    assert "from 2024-03-15 to 2024-03-15" in response.text
 
 
 def test_composition_detail_not_found() -> None:
@@ -115,3 +128,30 @@ def test_composition_detail_not_found() -> None:
     assert response.status_code == 404
     assert "text/html" in response.headers["content-type"]
     assert "Composition not found" in response.text
+
+
+def test_search_results_are_cached_per_data_version(mock_db: MagicMock) -> None:
+    mock_db.get_data_version.return_value = 1
+    first = client.get("/search/?q=Bach&type=composers")
+    second = client.get("/search/?type=composers&q=Bach")
+    assert first.text == second.text
+    assert first.headers["etag"] == second.headers["etag"]
+    assert mock_db.search_composers_by_name.await_count == 1
+    mock_db.get_data_version.return_value = 2
+    client.get("/search/?q=Bach&type=composers")
+    assert mock_db.search_composers_by_name.await_count == 2
+
+
+def test_composer_detail_page_revalidation(mock_db: MagicMock) -> None:
+    mock_db.get_data_version.return_value = 1
+    etag = client.get("/composers/1/").headers["etag"]
+    revalidated = client.get("/composers/1/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert mock_db.get_composer_detail.await_count == 1
+
+
+def test_not_found_page_is_not_cached(mock_db: MagicMock) -> None:
+    mock_db.get_data_version.return_value = 1
+    assert client.get("/composers/999/").status_code == 404
+    assert client.get("/composers/999/").status_code == 404
+    assert mock_db.get_composer_detail.await_count == 2
@@ -0,0 +1,85 @@
+from typing import Awaitable, Callable
+
+import pytest
+from fastapi import Request, Response
+
+from nfmer.api.v1.response_cache import ResponseCache, strong_etag
+
+
+def make_request(path: str = "/composers/1", query: str = "", if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "root_path": "",
+            "path": path,
+            "query_string": query.encode(),
+            "headers": headers,
+        }
+    )
+
+
+def renderer(calls: list[str], body: str) -> Callable[[], Awaitable[bytes]]:
+    async def render() -> bytes:
+        calls.append(body)
+        return body.encode()
+
+    return render
+
+
+ETAG = strong_etag(b"bach")
+
+
+@pytest.mark.parametrize(
+    "if_none_match, status_code",
+    [
+        (ETAG, 304),
+        (f'"stale", {ETAG}', 304),
+        (f"W/{ETAG}", 304),
+        (f'W/"stale",W/{ETAG}', 304),
+        ("*", 304),
+        ('"stale"', 200),
+        (f'"{ETAG}"', 200),
+        ("", 200),
+    ],
+)
+async def test_respond_matches_if_none_match(if_none_match: str, status_code: int) -> None:
+    response = await ResponseCache().respond(make_request(if_none_match=if_none_match), 1, renderer([], "bach"))
+    assert response.status_code == status_code
+    assert response.headers["etag"] == ETAG
+    assert response.body == (b"bach" if status_code == 200 else b"")
+
+
+async def test_respond_evicts_least_recently_used_entries() -> None:
+    cache = ResponseCache(max_entries=2)
+    calls: list[str] = []
+    for path in ["/a", "/b", "/a", "/c", "/b", "/a"]:
+        await cache.respond(make_request(path), 1, renderer(calls, path))
+    # /a was used again before /c came in, so /b went first; then /b pushed out /a
+    assert calls == ["/a", "/b", "/c", "/b", "/a"]
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+async def test_respond_keys_by_sorted_query_and_data_version() -> None:
+    cache = ResponseCache()
+    calls: list[str] = []
+    await cache.respond(make_request("/search/", "q=bach&type=composers"), 1, renderer(calls, "first"))
+    second = await cache.respond(make_request("/search/", "type=composers&q=bach"), 1, renderer(calls, "second"))
+    assert second.body == b"first"
+    third = await cache.respond(make_request("/search/", "type=composers&q=bach"), 2, renderer(calls, "third"))
+    assert third.body == b"third"
+    assert calls == ["first", "third"]
+
+
+async def test_respond_passes_ready_responses_through_uncached() -> None:
+    cache = ResponseCache()
+
+    async def not_found() -> Response:
+        return Response(b"missing", status_code=404)
+
+    assert (await cache.respond(make_request(), 1, not_found)).status_code == 404
+    assert len(cache) == 0
@@ -0,0 +1,37 @@
+from datetime import date
+from pathlib import Path
+
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.models import NFM_Event
+
+
+async def test_async_handler_reads_saved_events(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path}/events.db")
+    db_handler.save_event_data(mock_events_dict)
+    db_handler.refresh_read_models()
+    db = AsyncDatabaseHandler(f"sqlite+aiosqlite:///{tmp_path}/events.db")
+    try:
+        assert sorted(await db.get_all_events()) == ["1", "2"]
+        assert await db.get_data_version() == 2
+        event = await db.get_event_by_id("1")
+        assert event is not None
+        assert event.location == "Fake place"
+        assert [composition.composition_name for composition in event.compositions] == ["Symphony No. 7"]
+        upcoming = await db.get_upcoming_events(today=date(2020, 1, 1))
+        assert [(e.id, e.compositions[0].composer.composer_name) for e in upcoming] == [("2", "Snoop Dogg")]
+        assert len(await db.get_all_compositions()) == 2
+        gin_and_juice = await db.search_compositions_by_name("gin and juice")
+        assert gin_and_juice[0].composer.composer_name == "Snoop Dogg"
+        assert await db.get_composition_by_id(gin_and_juice[0].id or 0) == gin_and_juice[0]
+        snoop_dogg = (await db.search_composers_by_name("snoop dogg"))[0]
+        composer = await db.get_composer_by_id(snoop_dogg.id or 0)
+        assert composer is not None
+        assert [composition.composition_name for composition in composer.compositions] == ["Gin and Juice"]
+        composer_detail = await db.get_composer_detail(snoop_dogg.id or 0)
+        assert composer_detail is not None
+        assert composer_detail == db_handler.get_composer_detail(snoop_dogg.id or 0)
+        assert (await db.get_compositions_by_event("1"))[0].composition_name == "Symphony No. 7"
+        assert (await db.get_compositions_by_composer("Snoop Dogg"))[0].events[0].id == "2"
+    finally:
+        await db.dispose()
@@ -1,9 +1,13 @@
 from datetime import date
+from pathlib import Path
 
-from sqlmodel import Session
+from pytest_mock import MockerFixture
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
 
-from nfmer.db_handler import DatabaseHandler, get_db
-from nfmer.models import NFM_Event
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.export import ExportFormat, ExportTable
+from nfmer.models import ComposerDetail, CompositionDetail, NFM_Event
 
 
 def test_save_and_retrieve_events(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
@@ -48,7 +52,261 @@ def test_update_existing_event(db_handler: DatabaseHandler, mock_events_dict: di
     assert compositions[0].composition_name == "squabble up"
 
 
-def test_get_db() -> None:
-    db_generator = get_db()
-    db = next(db_generator)
-    assert isinstance(db, DatabaseHandler)
+def test_event_hashes_and_tombstones(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    mock_events_dict["2"].content_hash = "abc"
+    db_handler.save_event_data(mock_events_dict)
+    assert db_handler.get_event_hashes() == {"1": None, "2": "abc"}
+    tombstoned = db_handler.tombstone_missing_events(["1"], today=date(2025, 1, 1))
+    assert tombstoned == 1  # event 1 is in the past, it just dropped off the calendar
+    event2 = db_handler.get_event_by_id("2")
+    assert event2 is not None
+    assert event2.tombstoned
+    db_handler.save_event_data({"2": mock_events_dict["2"]})
+    event2 = db_handler.get_event_by_id("2")
+    assert event2 is not None
+    assert not event2.tombstoned
+
+
+def test_tombstones_follow_the_listing(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_handler.save_event_data(mock_events_dict)
+    assert db_handler.tombstone_missing_events([], today=date(2000, 1, 1)) == 0  # no listing, nothing to compare
+    many_ids = [str(event_id) for event_id in range(3, 2000)]  # more than SQLite's bound parameters limit
+    assert db_handler.tombstone_missing_events(["1"] + many_ids, today=date(2000, 1, 1)) == 1
+    version = db_handler.get_data_version()
+    assert db_handler.restore_listed_events(many_ids + ["2"]) == 1
+    assert db_handler.get_data_version() == version + 1
+    event2 = db_handler.get_event_by_id("2")
+    assert event2 is not None
+    assert not event2.tombstoned
+    assert db_handler.restore_listed_events(["2"]) == 0
+    assert db_handler.get_data_version() == version + 1
+
+
+def test_missing_columns_are_added(tmp_path: Path) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    engine = create_engine(db_path)
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE events (id VARCHAR PRIMARY KEY, location VARCHAR, date DATE, hour VARCHAR, url VARCHAR)")
+        )
+        connection.execute(text("INSERT INTO events VALUES ('1', 'Main Hall', '2030-01-01', '19:00:00', 'url')"))
+    db_handler = DatabaseHandler(db_path)
+    event = db_handler.get_event_by_id("1")
+    assert event is not None
+    assert event.content_hash is None
+    assert event.tombstoned is False
+
+
+def test_save_event_data_reuses_composers_and_compositions(db_handler: DatabaseHandler) -> None:
+    events = {
+        str(event_id): NFM_Event(
+            url=f"https://fake-url.com/events/event/{event_id}",
+            event_programme={"W. A. Mozart": f"Symphony No. {event_id % 3}", f"Composer {event_id}": "Overture"},
+            location="Main Hall",
+            date=date(2030, 1, 1),
+            hour="19:00:00",
+        )
+        for event_id in range(1200)
+    }
+    stats = db_handler.save_event_data(events)
+    assert stats.events == 1200
+    assert stats.composers_created == 1201
+    assert stats.compositions_created == 1203
+    assert stats.links == 2400
+    assert stats.rows_per_second > 0
+    assert len(db_handler.get_compositions_by_composer("W. A. Mozart")) == 3
+    stats = db_handler.save_event_data(events)
+    assert stats.composers_created == 0
+    assert stats.compositions_created == 0
+    assert len(db_handler.get_all_composers()) == 1201
+    assert len(db_handler.get_compositions_by_event("7")) == 2
+
+
+def test_identity_cache_is_warmed_and_used(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    DatabaseHandler(db_path).save_event_data(mock_events_dict)
+    db_handler = DatabaseHandler(db_path)
+    db_handler.warm_identity_cache()
+    assert db_handler.composer_ids.get("snoop dogg") == 2
+    stats = db_handler.save_event_data(mock_events_dict)
+    assert stats.composers_created == 0
+    assert db_handler.composer_ids.misses == 0
+    assert db_handler.composition_ids.misses == 0
+
+
+def test_backfill_progress(db_handler: DatabaseHandler) -> None:
+    db_handler.save_backfill_progress(done_ids=[10, 9, 8, 5], not_found_ids=[7, 6], failures={4: "timeout", 3: "500"})
+    assert db_handler.get_backfill_ranges() == [(5, 10)]
+    assert db_handler.get_backfill_failures() == {3: 1, 4: 1}
+    db_handler.save_backfill_progress(done_ids=[4], not_found_ids=[], failures={3: "timeout again"})
+    assert db_handler.get_backfill_ranges() == [(4, 10)]
+    assert db_handler.get_backfill_failures() == {3: 2}
+
+
+def test_search_uses_fts_index(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_handler.save_event_data(mock_events_dict)
+    assert [c.composer_name for c in db_handler.search_composers_by_name("dvor")] == ["A. Dvorak"]
+    assert [c.composer_name for c in db_handler.search_composers_by_name("Sn")] == ["Snoop Dogg"]  # prefix
+    assert db_handler.search_composers_by_name('dog" OR "dvo') == []
+    mock_events_dict["1"].event_programme = {"A. Dvorak": "Symphony No. 9"}
+    db_handler.save_event_data({"1": mock_events_dict["1"]})
+    assert [c.composition_name for c in db_handler.search_compositions_by_name("symphony")] == [
+        "Symphony No. 7",
+        "Symphony No. 9",
+    ]
+    with db_handler.engine.begin() as connection:
+        connection.execute(
+            text("UPDATE compositions SET composition_name = 'Rusalka', normalized_name = 'rusalka' WHERE id = 1")
+        )
+        connection.execute(text("DELETE FROM compositions WHERE composition_name = 'Gin and Juice'"))
+    assert [c.composition_name for c in db_handler.search_compositions_by_name("symphony")] == ["Symphony No. 9"]
+    assert [c.composition_name for c in db_handler.search_compositions_by_name("rusal")] == ["Rusalka"]
+    assert db_handler.search_compositions_by_name("juice") == []
+
+
+def test_fts_index_is_built_for_existing_rows(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    DatabaseHandler(db_path).save_event_data(mock_events_dict)
+    with create_engine(db_path).begin() as connection:
+        connection.execute(text("DROP TABLE composers_fts"))
+        connection.execute(text("DROP TRIGGER composers_fts_insert"))
+    assert [c.composer_name for c in DatabaseHandler(db_path).search_composers_by_name("snoop")] == ["Snoop Dogg"]
+
+
+def test_names_are_matched_by_normalized_name(db_handler: DatabaseHandler) -> None:
+    event = NFM_Event(
+        url="https://fake-url.com/events/event/1",
+        event_programme={"Antonín Dvořák": "Symphony No. 9 \u201eFrom the New World\u201d"},
+        date=date(2030, 1, 1),
+    )
+    db_handler.save_event_data({"1": event})
+    event.event_programme = {"antonin  DVORAK": "symphony no.\xa09 \u201efrom the new world\u201d"}
+    stats = db_handler.save_event_data({"2": event})
+    assert stats.composers_created == 0
+    assert stats.compositions_created == 0
+    assert [c.composer_name for c in db_handler.get_all_composers()] == ["Antonín Dvořák"]
+    assert [c.composer_name for c in db_handler.search_composers_by_name("dvorak")] == ["Antonín Dvořák"]
+    assert [c.composer_name for c in db_handler.search_composers_by_name("ANTONÍN")] == ["Antonín Dvořák"]
+    assert len(db_handler.search_compositions_by_name("new world")) == 1
+    assert len(db_handler.get_compositions_by_composer("Antonin Dvorak")[0].events) == 2
+
+
+def test_normalized_names_are_backfilled(tmp_path: Path) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    with create_engine(db_path).begin() as connection:
+        connection.execute(text("CREATE TABLE composers (id INTEGER PRIMARY KEY, composer_name VARCHAR NOT NULL)"))
+        connection.execute(text("INSERT INTO composers VALUES (1, 'Henryk Mikołaj Górecki')"))
+    db_handler = DatabaseHandler(db_path)
+    composer = db_handler.get_composer_by_id(1)
+    assert composer is not None
+    assert composer.normalized_name == "henryk mikolaj gorecki"
+    assert [c.id for c in db_handler.search_composers_by_name("gorecki")] == [1]
+
+
+def test_keyset_pagination(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_handler.save_event_data(mock_events_dict)
+    assert db_handler.get_all_events(limit=1) == ["1"]
+    assert db_handler.get_all_events(limit=1, after="1") == ["2"]
+    assert db_handler.get_all_events(after="2") == []
+    first_page = db_handler.get_all_composers(limit=1)
+    assert [c.composer_name for c in first_page] == ["A. Dvorak"]
+    assert [c.composer_name for c in db_handler.get_all_composers(limit=1, after=first_page[-1].id)] == ["Snoop Dogg"]
+    assert [c.composition_name for c in db_handler.get_all_compositions(limit=5, after=1)] == ["Gin and Juice"]
+
+
+def test_export_reads_in_chunks(
+    db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event], mocker: MockerFixture
+) -> None:
+    mocker.patch("nfmer.db_handler.EXPORT_CHUNK_SIZE", 1)
+    db_handler.save_event_data(mock_events_dict)
+    chunks = list(db_handler.export(ExportTable.COMPOSERS, ExportFormat.CSV))
+    assert chunks == ["id,composer_name\n", "1,A. Dvorak\n", "2,Snoop Dogg\n"]
+    ndjson = "".join(db_handler.export(ExportTable.COMPOSITIONS, ExportFormat.NDJSON))
+    assert ndjson.splitlines()[1] == '{"id": 2, "composer_id": 2, "composition_name": "Gin and Juice"}'
+
+
+def test_writes_bump_data_version(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    assert db_handler.get_data_version() == 0
+    db_handler.save_event_data(mock_events_dict)
+    assert db_handler.get_data_version() == 1
+    db_handler.tombstone_missing_events(["1", "2"], today=date(2000, 1, 1))
+    assert db_handler.get_data_version() == 1
+    db_handler.tombstone_missing_events(["1"], today=date(2000, 1, 1))
+    assert db_handler.get_data_version() == 2
+
+
+def test_read_models_follow_saved_events(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    mock_events_dict["3"] = NFM_Event(
+        url="https://fake-url.com/events/event/3",
+        event_programme={"A. Dvorak": "Symphony No. 7"},
+        location="Main Hall",
+        date=date(2012, 1, 1),
+        hour="19:00:00",
+    )
+    db_handler.save_event_data(mock_events_dict)
+    assert db_handler.get_composition_detail(1) is None  # saving only marks the read models stale
+    assert db_handler.refresh_read_models() == 2
+    assert db_handler.refresh_read_models() == 0
+    composition = CompositionDetail.model_validate_json(db_handler.get_composition_detail(1) or "")
+    assert [event.id for event in composition.events] == ["1", "3"]
+    assert (composition.event_count, composition.first_performance) == (2, date(2011, 11, 11))
+    assert composition.last_performance == date(2012, 1, 1)
+    composer = ComposerDetail.model_validate_json(db_handler.get_composer_detail(1) or "")
+    assert (composer.composition_count, composer.event_count) == (1, 2)
+    assert composer.compositions[0] == composition
+    # event 3 changes its programme: the old composition loses it, the new one gets it
+    mock_events_dict["3"].event_programme = {"A. Dvorak": "Symphony No. 9"}
+    db_handler.save_event_data({"3": mock_events_dict["3"]})
+    version = db_handler.get_data_version()
+    assert db_handler.refresh_read_models() == 2
+    assert db_handler.get_data_version() == version + 1
+    composer = ComposerDetail.model_validate_json(db_handler.get_composer_detail(1) or "")
+    assert [(c.composition_name, c.event_count) for c in composer.compositions] == [
+        ("Symphony No. 7", 1),
+        ("Symphony No. 9", 1),
+    ]
+    assert (composer.event_count, composer.last_performance) == (2, date(2012, 1, 1))
+    assert db_handler.get_composer_detail(999) is None
+
+
+def test_read_models_are_built_for_existing_rows(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    DatabaseHandler(db_path).save_event_data(mock_events_dict)
+    with create_engine(db_path).begin() as connection:
+        connection.execute(text("DELETE FROM composition_summaries"))
+        connection.execute(text("DELETE FROM composer_summaries"))
+    db_handler = DatabaseHandler(db_path)
+    composer = ComposerDetail.model_validate_json(db_handler.get_composer_detail(2) or "")
+    assert [c.composition_name for c in composer.compositions] == ["Gin and Juice"]
+    assert composer.first_performance == date(2032, 2, 29)
+
+
+def test_calendar_queries(db_handler: DatabaseHandler, mock_events_dict: dict[str, NFM_Event]) -> None:
+    mock_events_dict["3"] = NFM_Event(
+        url="https://fake-url.com/events/event/3",
+        event_programme={"A. Dvorak": "Symphony No. 9", "Snoop Dogg": "Gin and Juice"},
+        location="Main Hall",
+        date=date(2032, 2, 29),
+        hour="11:00:00",
+    )
+    mock_events_dict["4"] = NFM_Event(
+        url="https://fake-url.com/events/event/4",
+        event_programme={"A. Dvorak": "Symphony No. 7"},
+        location="Fake place",
+        date=date(2033, 1, 1),
+        hour="19:00:00",
+    )
+    db_handler.save_event_data(mock_events_dict)
+    between = db_handler.get_events_between(date(2030, 1, 1), date(2032, 12, 31))
+    assert [event.id for event in between] == ["3", "2"]  # same day, the morning one first
+    assert sorted(c.composition_name for c in between[0].compositions) == ["Gin and Juice", "Symphony No. 9"]
+    assert {c.composer.composer_name for c in between[0].compositions} == {"A. Dvorak", "Snoop Dogg"}
+    assert [event.id for event in db_handler.get_events_between(date(2030, 1, 1), limit=2, after="3")] == ["2", "4"]
+    dvorak = db_handler.search_composers_by_name("dvorak")[0]
+    assert [e.id for e in db_handler.get_events_between(date(2000, 1, 1), composer_id=dvorak.id)] == ["1", "3", "4"]
+    symphony_7 = db_handler.search_compositions_by_name("symphony no. 7")[0]
+    assert [e.id for e in db_handler.get_events_between(date(2000, 1, 1), composition_id=symphony_7.id)] == ["1", "4"]
+    assert [e.id for e in db_handler.get_upcoming_events(location="Main Hall", today=date(2025, 1, 1))] == ["3", "2"]
+    db_handler.tombstone_missing_events(["3", "4"], today=date(2025, 1, 1))
+    assert [e.id for e in db_handler.get_upcoming_events(1, today=date(2025, 1, 1))] == ["3"]
+    assert [e.id for e in db_handler.get_upcoming_events(today=date(2025, 1, 1))] == ["3", "4"]
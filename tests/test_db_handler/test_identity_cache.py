@@ -0,0 +1,25 @@
+from nfmer.db_handler.identity_cache import IdentityCache
+
+
+def test_identity_cache_get_and_split() -> None:
+    cache: IdentityCache[str] = IdentityCache()
+    cache.update({"Bach": 1, "Mozart": 2})
+    assert cache.get("Bach") == 1
+    assert cache.get("Haydn") is None
+    known, unknown = cache.split(["Bach", "Mozart", "Haydn"])
+    assert known == {"Bach": 1, "Mozart": 2}
+    assert unknown == {"Haydn"}
+    assert cache.hits == 3
+    assert cache.misses == 2
+
+
+def test_identity_cache_evicts_least_recently_used() -> None:
+    cache: IdentityCache[str] = IdentityCache(max_size=2)
+    cache.put("Bach", 1)
+    cache.put("Mozart", 2)
+    cache.get("Bach")
+    cache.put("Haydn", 3)
+    assert len(cache) == 2
+    assert "Mozart" not in cache
+    assert "Bach" in cache
+    assert "Haydn" in cache
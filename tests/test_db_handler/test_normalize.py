@@ -0,0 +1,17 @@
+import pytest
+
+from nfmer.db_handler.normalize import normalize_name
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("Antonín Dvořák", "antonin dvorak"),
+        ("Henryk Mikołaj GÓRECKI", "henryk mikolaj gorecki"),
+        ("  Wojciech\xa0Kilar \n", "wojciech kilar"),
+        ("Richard Strauss: Also sprach Zarathustra", "richard strauss: also sprach zarathustra"),
+        ("Straße", "strasse"),
+    ],
+)
+def test_normalize_name(name: str, expected: str) -> None:
+    assert normalize_name(name) == expected
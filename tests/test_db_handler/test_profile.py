@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.async_handler import AsyncDatabaseHandler
+from nfmer.db_handler.profile import SQLiteProfile
+from nfmer.models import NFM_Event
+
+
+def test_profile_is_applied_on_connect(tmp_path: Path) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}", profile=SQLiteProfile(busy_timeout=1234))
+    with db_handler.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert connection.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 0
+
+
+async def test_api_reads_are_read_only(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db = AsyncDatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    try:
+        await db.create_schema()  # writes through a connection of its own
+        DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}").save_event_data(mock_events_dict)
+        assert sorted(await db.get_all_events()) == ["1", "2"]
+        async with db.engine.connect() as connection:
+            assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                await connection.execute(text("DELETE FROM events"))
+    finally:
+        await db.dispose()
+
+
+async def test_reads_are_not_blocked_by_a_write(tmp_path: Path, mock_events_dict: dict[str, NFM_Event]) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    db_handler = DatabaseHandler(db_path)
+    db_handler.save_event_data({"1": mock_events_dict["1"]})
+    db = AsyncDatabaseHandler(db_path, profile=SQLiteProfile(busy_timeout=0))
+    try:
+        with db_handler.engine.connect() as writer:
+            writer.exec_driver_sql("BEGIN EXCLUSIVE")  # with a rollback journal this locks readers out
+            writer.exec_driver_sql("DELETE FROM events")
+            assert await db.get_all_events() == ["1"]  # the last committed snapshot
+            writer.exec_driver_sql("COMMIT")
+        assert await db.get_all_events() == []
+    finally:
+        await db.dispose()
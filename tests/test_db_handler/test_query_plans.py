@@ -0,0 +1,142 @@
+import inspect
+from datetime import date, timedelta
+from typing import Any, Callable, Iterator
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.query_methods import QUERY_METHODS as BENCHMARKED_METHODS
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.batching import chunked
+from nfmer.db_handler.export import ExportFormat, ExportTable
+from nfmer.models import NFM_Event
+
+EVENTS = 3000
+COMPOSERS = 300
+
+
+def generate_events(first_id: int, count: int) -> dict[str, NFM_Event]:
+    return {
+        str(event_id): NFM_Event(
+            url=f"https://fake-url.com/event/{event_id}",
+            event_programme={
+                f"Composer {(event_id * step) % COMPOSERS}": f"Work {(event_id + step) % 40}" for step in (1, 7, 13)
+            },
+            location=f"Hall {event_id % 5}",
+            date=date(2000, 1, 1) + timedelta(days=event_id * 3),
+            hour="19:00",
+        )
+        for event_id in range(first_id, first_id + count)
+    }
+
+
+@pytest.fixture(scope="module")
+def large_db(tmp_path_factory: pytest.TempPathFactory) -> DatabaseHandler:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'events.db'}")
+    events = generate_events(1, EVENTS)
+    for event_ids in chunked(events, 500):
+        db_handler.save_event_data({event_id: events[event_id] for event_id in event_ids})
+    db_handler.refresh_read_models()
+    return db_handler
+
+
+# every public DatabaseHandler method, called the way the scraper and the API call it,
+# with the tables it is allowed to scan in full (because it reads the whole table by design)
+QUERY_METHODS: dict[str, tuple[Callable[[DatabaseHandler], Any], set[str]]] = {
+    "warm_identity_cache": (lambda db: db.warm_identity_cache(), {"composers", "compositions"}),
+    "save_event_data": (lambda db: db.save_event_data(generate_events(EVENTS - 50, 100)), set()),
+    "refresh_read_models": (
+        lambda db: (db.save_event_data(generate_events(1, 100)), db.refresh_read_models()),
+        {"stale_compositions"},
+    ),
+    "save_backfill_progress": (lambda db: db.save_backfill_progress([1, 2, 3], [4], {5: "error"}), set()),
+    "get_backfill_ranges": (lambda db: db.get_backfill_ranges(), {"backfill_ranges"}),
+    "get_backfill_failures": (lambda db: db.get_backfill_failures(), {"backfill_failures"}),
+    "get_event_hashes": (lambda db: db.get_event_hashes(), {"events"}),
+    "get_data_version": (lambda db: db.get_data_version(), set()),
+    "restore_listed_events": (lambda db: db.restore_listed_events(["2990", "2991"]), set()),
+    "tombstone_missing_events": (
+        lambda db: db.tombstone_missing_events(["2990", "2991"], today=date(2000, 1, 1) + timedelta(days=8900)),
+        set(),
+    ),
+    "export": (
+        lambda db: [list(db.export(table, ExportFormat.CSV)) for table in ExportTable],
+        {"events", "composers", "compositions", "event_composition_link"},
+    ),
+    "get_all_events": (lambda db: db.get_all_events(limit=100, after="1500"), set()),
+    "get_event_by_id": (lambda db: db.get_event_by_id("1500"), set()),
+    "get_events_between": (
+        lambda db: (
+            db.get_events_between(date(2010, 1, 1), date(2012, 1, 1), limit=100, after="1300"),
+            db.get_events_between(date(2010, 1, 1), composer_id=12, location="Hall 1", limit=100),
+            db.get_events_between(date(2010, 1, 1), composition_id=100, limit=100),
+        ),
+        set(),
+    ),
+    "get_upcoming_events": (lambda db: db.get_upcoming_events(10, today=date(2020, 1, 1)), set()),
+    "get_all_compositions": (lambda db: db.get_all_compositions(limit=100, after=500), set()),
+    "search_compositions_by_name": (
+        lambda db: (db.search_compositions_by_name("work 1"), db.search_compositions_by_name("wo")),
+        set(),
+    ),
+    "get_composition_by_id": (lambda db: db.get_composition_by_id(100), set()),
+    "get_composition_detail": (lambda db: db.get_composition_detail(100), set()),
+    "get_all_composers": (lambda db: db.get_all_composers(limit=100, after=100), set()),
+    "search_composers_by_name": (
+        lambda db: (db.search_composers_by_name("composer 12"), db.search_composers_by_name("co")),
+        set(),
+    ),
+    "get_composer_by_id": (lambda db: db.get_composer_by_id(10), set()),
+    "get_composer_detail": (lambda db: db.get_composer_detail(10), set()),
+    "get_compositions_by_event": (lambda db: db.get_compositions_by_event("1500"), set()),
+    "get_compositions_by_composer": (lambda db: db.get_compositions_by_composer("Composer 12"), set()),
+}
+
+
+@pytest.fixture
+def executed_statements(large_db: DatabaseHandler) -> Iterator[list[tuple[str, Any]]]:
+    statements: list[tuple[str, Any]] = []
+
+    def record(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(large_db.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(large_db.engine, "before_cursor_execute", record)
+
+
+def full_scans(db_handler: DatabaseHandler, statement: str, parameters: Any) -> set[str]:
+    """Tables the statement reads in full, according to SQLite's query plan"""
+    connection = db_handler.engine.raw_connection()
+    try:
+        plan = connection.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        connection.close()
+    scans = set()
+    for *_, detail in plan:
+        # "SCAN <table or alias> [USING ...]"; FTS lookups show up as scans of the virtual table
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail and "CONSTANT ROW" not in detail:
+            scans.add(detail.split()[1])
+    return scans
+
+
+def test_every_query_method_is_covered() -> None:
+    public_methods = {
+        name for name, _ in inspect.getmembers(DatabaseHandler, inspect.isfunction) if not name.startswith("_")
+    }
+    assert public_methods == set(QUERY_METHODS)
+    # and benchmarked, save_event_data has a benchmark of its own
+    assert public_methods - {"save_event_data"} == set(BENCHMARKED_METHODS)
+
+
+@pytest.mark.parametrize("method", QUERY_METHODS)
+def test_query_does_not_scan_tables(
+    method: str, large_db: DatabaseHandler, executed_statements: list[tuple[str, Any]]
+) -> None:
+    call, allowed_scans = QUERY_METHODS[method]
+    call(large_db)
+    assert executed_statements
+    for statement, parameters in executed_statements:
+        aliases = full_scans(large_db, statement, parameters)
+        assert aliases <= allowed_scans | {f"{table}_1" for table in allowed_scans}, statement
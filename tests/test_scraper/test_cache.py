@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from nfmer.scraper.cache import ResponseCache
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    with ResponseCache(tmp_path) as cache:
+        assert cache.get("https://example.com/1") is None
+        cache.put("https://example.com/1", b"body", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        cached = cache.get("https://example.com/1")
+    assert cached is not None
+    assert cached.content == b"body"
+    assert cached.etag == '"abc"'
+    assert cached.last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_cache_persists_on_disk(tmp_path: Path) -> None:
+    with ResponseCache(tmp_path) as cache:
+        cache.put("https://example.com/1", b"body")
+    with ResponseCache(tmp_path) as cache:
+        cached = cache.get("https://example.com/1")
+    assert cached is not None
+    assert cached.content == b"body"
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    with ResponseCache(tmp_path, max_size=10) as cache:
+        cache.put("https://example.com/1", b"1234")
+        cache.put("https://example.com/2", b"1234")
+        cache.get("https://example.com/1")
+        cache.put("https://example.com/3", b"1234")
+        assert cache.total_size() <= 10
+        assert cache.get("https://example.com/2") is None
+        assert cache.get("https://example.com/1") is not None
+        assert cache.get("https://example.com/3") is not None
@@ -1,8 +1,12 @@
+import asyncio
+from pathlib import Path
+
 import httpx
 import pytest
 from bs4 import BeautifulSoup
 from pytest_httpx import HTTPXMock
 
+from nfmer.scraper.cache import ResponseCache
 from nfmer.scraper.fetcher import Fetcher, FetcherException
 
 
@@ -46,3 +50,80 @@ async def test_fetch_soup_http_error(mock_url: str, httpx_mock: HTTPXMock) -> No
     fetcher = Fetcher()
     with pytest.raises(FetcherException):
         await fetcher.fetch_soup(mock_url)
+
+
+@pytest.mark.asyncio
+async def test_fetcher_reuses_client(mock_html_response: str, mock_url: str, httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(status_code=200, html=mock_html_response, is_reusable=True)
+    async with Fetcher() as fetcher:
+        client = fetcher._get_client()
+        await fetcher.fetch_soup(mock_url)
+        await fetcher.fetch_soup(mock_url)
+        assert fetcher._get_client() is client
+    assert client.is_closed
+    assert fetcher._client is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_revalidates_cached_page(
+    mock_html_response: str, mock_url: str, httpx_mock: HTTPXMock, tmp_path: Path
+) -> None:
+    httpx_mock.add_response(status_code=200, html=mock_html_response, headers={"ETag": '"v1"'})
+    httpx_mock.add_response(status_code=304, match_headers={"If-None-Match": '"v1"'})
+    with ResponseCache(tmp_path) as cache:
+        async with Fetcher(cache=cache) as fetcher:
+            first = await fetcher.fetch(mock_url)
+            second = await fetcher.fetch(mock_url)
+    assert not first.not_modified
+    assert second.not_modified
+    assert second.content == first.content
+
+
+@pytest.mark.asyncio
+async def test_fetch_offline_replays_cache(mock_html_response: str, mock_url: str, tmp_path: Path) -> None:
+    with ResponseCache(tmp_path) as cache:
+        cache.put(mock_url, mock_html_response.encode())
+        fetcher = Fetcher(cache=cache, offline=True)
+        soup = await fetcher.fetch_soup(mock_url)
+        element = soup.find("div", class_="test")
+        assert element is not None
+        with pytest.raises(FetcherException):
+            await fetcher.fetch("https://mock-url.com/not-cached")
+
+
+def test_fetcher_offline_requires_cache() -> None:
+    with pytest.raises(ValueError):
+        Fetcher(offline=True)
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_server_errors_only(mock_html_response: str, mock_url: str, httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(status_code=503, headers={"Retry-After": "0"})
+    httpx_mock.add_response(status_code=200, html=mock_html_response)
+    httpx_mock.add_response(url="https://mock-url.com/missing", status_code=404)
+    async with Fetcher() as fetcher:
+        result = await fetcher.fetch(mock_url)
+        with pytest.raises(FetcherException) as error:
+            await fetcher.fetch("https://mock-url.com/missing")
+    assert result.content == mock_html_response.encode()
+    assert error.value.error_code == 404
+    assert fetcher.retry_policy.stats.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_wait_is_not_fetch_time(
+    mock_html_response: str, mock_url: str, httpx_mock: HTTPXMock
+) -> None:
+    httpx_mock.add_response(status_code=503, headers={"Retry-After": "0"})
+    httpx_mock.add_response(status_code=200, html=mock_html_response)
+
+    async def slow_acquire(url: str) -> None:
+        await asyncio.sleep(0.1)
+
+    async with Fetcher() as fetcher:
+        fetcher.rate_limiter.acquire = slow_acquire  # type: ignore [method-assign]
+        await fetcher.fetch(mock_url)
+    stats = fetcher.retry_policy.stats
+    assert stats.attempts == 2  # every attempt waits for a token of its own
+    assert stats.throttle_seconds >= 0.2
+    assert stats.fetch_seconds < 0.1
@@ -1,9 +1,10 @@
 from datetime import date, datetime
+from pathlib import Path
 
 import pytest
 from bs4 import BeautifulSoup
 
-from nfmer.scraper.parser import PLACEHOLDER_DATE, Parser
+from nfmer.scraper.parser import PARSER_BACKENDS, PLACEHOLDER_DATE, Parser
 
 
 @pytest.fixture
@@ -59,3 +60,27 @@ def test_parse_event_with_attribute_errors(mock_event_url: str, parser: Parser)
     assert len(event.event_programme) == 0
     assert event.date == PLACEHOLDER_DATE
     assert event.hour == "00:00:00"
+
+
+@pytest.fixture
+def event_page() -> bytes:
+    return (Path(__file__).parent / "fixtures" / "event_page.html").read_bytes()
+
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+@pytest.mark.parametrize("strain", [True, False])
+def test_parse_content_identical_across_backends(
+    mock_event_url: str, event_page: bytes, backend: str, strain: bool
+) -> None:
+    reference = Parser("html.parser", strain=False).parse(mock_event_url, BeautifulSoup(event_page, "html.parser"))
+    event = Parser(backend, strain=strain).parse_content(mock_event_url, event_page)
+    assert event == reference
+    assert event is not None
+    assert event.location == "NFM, Main Hall"
+    assert event.hour == "19:00:00"
+    assert event.event_programme["Johannes Brahms"] == "Symphony No. 4 in E minor, Op. 98"
+
+
+def test_parser_rejects_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        Parser("html5lib")
@@ -0,0 +1,90 @@
+import hashlib
+from unittest.mock import AsyncMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from nfmer.models import NFM_Event
+from nfmer.scraper.fetcher import FetcherException, FetchResult
+from nfmer.scraper.pipeline import OutcomeStatus, ScrapeOutcome, ScrapePipeline
+
+
+def fake_fetch(url: str) -> FetchResult:
+    event_id = url.split("/")[-1]
+    if event_id == "404":
+        raise FetcherException("Not found", "GET", 404)
+    if event_id == "500":
+        raise FetcherException("Server error", "GET", 500)
+    if event_id == "304":
+        return FetchResult(url, b"cached", not_modified=True)
+    return FetchResult(url, url.encode())
+
+
+@pytest.fixture
+def jobs() -> list[tuple[str, str]]:
+    return [(event_id, f"https://fake-url.com/event/{event_id}") for event_id in ["1", "404", "500", "304", "2"]]
+
+
+async def test_pipeline_routes_every_job_to_one_outcome(jobs: list[tuple[str, str]], mocker: MockerFixture) -> None:
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    batches: list[list[ScrapeOutcome]] = []
+    known_hashes: dict[str, str | None] = {"304": hashlib.sha256(b"cached").hexdigest()}
+    pipeline = ScrapePipeline(
+        mock_fetcher,
+        mock_parser,
+        batches.append,
+        known_hashes=known_hashes,
+        fetch_workers=2,
+        queue_size=1,
+        batch_size=2,
+    )
+    stats = await pipeline.run(jobs)
+    outcomes = {outcome.event_id: outcome for batch in batches for outcome in batch}
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert outcomes["1"].status == OutcomeStatus.PARSED
+    assert outcomes["1"].event is not None
+    assert outcomes["1"].event.content_hash != ""
+    assert outcomes["404"].status == OutcomeStatus.NOT_FOUND
+    assert outcomes["500"].status == OutcomeStatus.FAILED
+    assert outcomes["304"].status == OutcomeStatus.UNCHANGED
+    assert stats.events_saved == 2
+    assert stats.batches_written == 3
+
+
+async def test_pipeline_parses_not_modified_pages_missing_from_the_db(
+    jobs: list[tuple[str, str]], mocker: MockerFixture
+) -> None:
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    batches: list[list[ScrapeOutcome]] = []
+    stats = await ScrapePipeline(mock_fetcher, mock_parser, batches.append, known_hashes={"304": "older"}).run(jobs)
+    outcomes = {outcome.event_id: outcome for batch in batches for outcome in batch}
+    assert outcomes["304"].status == OutcomeStatus.PARSED
+    assert stats.events_saved == 3
+
+
+async def test_pipeline_marks_parse_errors_as_failed(jobs: list[tuple[str, str]], mocker: MockerFixture) -> None:
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = ValueError("broken page")
+    batches: list[list[ScrapeOutcome]] = []
+    stats = await ScrapePipeline(mock_fetcher, mock_parser, batches.append).run(jobs)
+    assert stats.events_saved == 0
+    assert stats.outcomes[OutcomeStatus.FAILED] == 4
+
+
+async def test_pipeline_propagates_sink_errors(jobs: list[tuple[str, str]], mocker: MockerFixture) -> None:
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    sink = mocker.Mock(side_effect=RuntimeError("database is locked"))
+    with pytest.raises(ExceptionGroup):
+        await ScrapePipeline(mock_fetcher, mock_parser, sink, batch_size=1).run(jobs)
+    sink.assert_called_once()
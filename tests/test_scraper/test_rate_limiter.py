@@ -0,0 +1,60 @@
+import pytest
+
+from nfmer.scraper.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_token_bucket_allows_burst_then_refills() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    for _ in range(3):
+        await bucket.acquire()
+    assert bucket.tokens == 0
+    clock.now = 1.0
+    bucket._refill()
+    assert bucket.tokens == 2.0
+    clock.now = 10.0
+    bucket._refill()
+    assert bucket.tokens == 3.0
+
+
+async def test_token_bucket_waits_for_token() -> None:
+    bucket = TokenBucket(rate=100.0, burst=1)
+    await bucket.acquire()
+    await bucket.acquire()
+    assert bucket.tokens < 1
+
+
+def test_token_bucket_rejects_invalid_config() -> None:
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+
+
+def test_rate_limiter_backs_off_and_recovers() -> None:
+    limiter = RateLimiter(rate=8.0, min_rate=1.0, max_rate=10.0, backoff_factor=0.5, recovery_step=1.0)
+    url = "https://www.nfm.wroclaw.pl/en/event/1"
+    limiter.record(url, 429)
+    assert limiter.current_rate(url) == 4.0
+    limiter.record(url, 503)
+    limiter.record(url, 503)
+    limiter.record(url, 503)
+    assert limiter.current_rate(url) == 1.0
+    limiter.record(url, 500)
+    assert limiter.current_rate(url) == 1.0
+    for _ in range(20):
+        limiter.record(url, 200)
+    assert limiter.current_rate(url) == 10.0
+
+
+def test_rate_limiter_keeps_hosts_separate() -> None:
+    limiter = RateLimiter(rate=8.0)
+    limiter.record("https://a.example.com/1", 429)
+    assert limiter.current_rate("https://a.example.com/2") == 4.0
+    assert limiter.current_rate("https://b.example.com/1") == 8.0
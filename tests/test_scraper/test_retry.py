@@ -0,0 +1,112 @@
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from nfmer.scraper.retry import RetryPolicy, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def status_error(status_code: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://fake-url.com")
+    response = httpx.Response(status_code, request=request, headers=headers)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def make_policy(clock: FakeClock, **kwargs: float) -> RetryPolicy:
+    # no randomness: every backoff is the full delay
+    return RetryPolicy(clock=clock, sleep=clock.sleep, jitter=lambda low, high: high, **kwargs)  # type: ignore
+
+
+async def test_retries_with_exponential_backoff() -> None:
+    clock = FakeClock()
+    policy = make_policy(clock, base_delay=1)
+    function = AsyncMock(side_effect=[httpx.ConnectTimeout("timeout"), status_error(502), "page"])
+    assert await policy.call(function) == "page"
+    assert function.await_count == 3
+    assert clock.now == 1 + 2
+    assert policy.stats.retries == 2
+    assert policy.stats.backoff_seconds == 3
+
+
+async def test_does_not_retry_client_errors() -> None:
+    policy = make_policy(FakeClock())
+    function = AsyncMock(side_effect=status_error(404))
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.call(function)
+    assert function.await_count == 1
+    assert policy.stats.retries == 0
+
+
+async def test_respects_retry_after() -> None:
+    clock = FakeClock()
+    policy = make_policy(clock)
+    function = AsyncMock(side_effect=[status_error(429, {"Retry-After": "7"}), "page"])
+    assert await policy.call(function) == "page"
+    assert clock.now == 7
+
+
+async def test_gives_up_after_max_attempts() -> None:
+    policy = make_policy(FakeClock(), max_attempts=2)
+    function = AsyncMock(side_effect=httpx.ConnectError("down"))
+    with pytest.raises(httpx.ConnectError):
+        await policy.call(function)
+    assert function.await_count == 2
+    assert policy.stats.failures == 1
+
+
+async def test_retry_budget_is_shared_between_calls() -> None:
+    policy = make_policy(FakeClock(), min_retries=1, retry_ratio=0, failure_threshold=100)
+    function = AsyncMock(side_effect=httpx.ConnectError("down"))
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await policy.call(function)
+    assert function.await_count == 2 + 1 + 1
+    assert policy.stats.budget_exhausted == 3
+
+
+async def test_circuit_breaker_pauses_calls() -> None:
+    clock = FakeClock()
+    policy = make_policy(clock, max_attempts=1, failure_threshold=2, reset_timeout=60)
+    failing = AsyncMock(side_effect=httpx.ConnectError("down"))
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await policy.call(failing)
+    assert policy.circuit_open
+    assert await policy.call(AsyncMock(return_value="page")) == "page"
+    assert clock.now == 60
+    assert policy.stats.circuit_opened == 1
+    assert policy.stats.circuit_seconds == 60
+
+
+async def test_throttle_counts_as_waiting_on_every_attempt() -> None:
+    clock = FakeClock()
+    policy = make_policy(clock, base_delay=1)
+
+    async def fetch() -> str:
+        clock.now += 0.5
+        if policy.stats.attempts == 1:
+            raise httpx.ConnectTimeout("timeout")
+        return "page"
+
+    assert await policy.call(fetch, throttle=lambda: clock.sleep(2)) == "page"
+    assert policy.stats.throttle_seconds == 2 + 2
+    assert policy.stats.fetch_seconds == 0.5 + 0.5
+    assert policy.stats.wait_seconds == 4 + 1
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470) == 10
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -1,21 +1,28 @@
+import hashlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
+from pathlib import Path
 from typing import Optional, Type
-from unittest.mock import AsyncMock
+from unittest.mock import ANY, AsyncMock, patch
 
 import pytest
 from bs4 import BeautifulSoup
 from pytest_httpx import HTTPXMock
 from pytest_mock import MockerFixture
 
-from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler import DatabaseHandler, SaveStats
 from nfmer.models import NFM_Event
 from nfmer.scraper import (
     Scraper,
     ScraperException,
     run_scraper,
 )
-from nfmer.scraper.fetcher import Fetcher, FetcherException
+from nfmer.scraper.cache import ResponseCache
+from nfmer.scraper.fetcher import Fetcher, FetcherException, FetchResult
 from nfmer.scraper.parser import Parser
+from nfmer.scraper.pipeline import OutcomeStatus, PipelineStats
+from nfmer.scraper.retry import RetryPolicy
 
 
 @pytest.fixture
@@ -56,6 +63,7 @@ async def test_scraper_initialise_success(
     mock_parser = mocker.Mock()
     mock_fetcher = AsyncMock()
     mock_fetcher.fetch_soup = AsyncMock(return_value=BeautifulSoup(mock_html_response, "html.parser"))
+    mock_fetcher.fetch = AsyncMock(return_value=FetchResult(mock_url, b"<html></html>"))
     scraper = await Scraper.initialise(mock_fetcher, mock_parser, mock_url)
     expected_events_dict = {
         "1": "https://fake-url.com/events/event/1",
@@ -95,7 +103,7 @@ async def test_scraper_scrape(
     mock_url: str, mocker: MockerFixture, parsed_event: Optional[NFM_Event], exception: Optional[Type[Exception]]
 ) -> None:
     mock_parser = mocker.Mock()
-    mock_parser.parse.return_value = parsed_event
+    mock_parser.parse_content.return_value = parsed_event
     mocked_html_response = """
     <html>
         <body>
@@ -107,9 +115,10 @@ async def test_scraper_scrape(
     """
     mock_fetcher = AsyncMock()
     mock_fetcher.fetch_soup = AsyncMock(return_value=BeautifulSoup(mocked_html_response, "html.parser"))
+    mock_fetcher.fetch = AsyncMock(return_value=FetchResult(mock_url, b"<html></html>"))
     scraper = await Scraper.initialise(mock_fetcher, mock_parser, mock_url)
     if exception:
-        mock_fetcher.fetch_soup = AsyncMock(side_effect=exception("I'm a fake error"))
+        mock_fetcher.fetch = AsyncMock(side_effect=exception("I'm a fake error"))
     scraped_events = await scraper.scrape()
     first_event = scraped_events.get("1")
     if not exception:
@@ -120,22 +129,141 @@ async def test_scraper_scrape(
         assert first_event is None
 
 
+async def test_scraper_skips_not_modified_events(mock_url: str, mocker: MockerFixture) -> None:
+    mock_parser = mocker.Mock()
+    mock_fetcher = AsyncMock()
+    scraper = Scraper(mock_fetcher, mock_parser, mock_url)
+    scraper.events_dict = {"1": f"{mock_url}/event/1"}
+    mock_fetcher.fetch = AsyncMock(return_value=FetchResult(mock_url, b"<html></html>", not_modified=True))
+    scraped_events = await scraper.scrape({"1": hashlib.sha256(b"<html></html>").hexdigest()})
+    assert scraped_events == {}
+    mock_parser.parse_content.assert_not_called()
+
+
+async def test_scraper_saves_not_modified_page_after_a_failed_save(
+    mock_url: str, httpx_mock: HTTPXMock, tmp_path: Path
+) -> None:
+    event_page = (Path(__file__).parent / "fixtures" / "event_page.html").read_bytes()
+    event_url = f"{mock_url}/event/1"
+    httpx_mock.add_response(url=event_url, content=event_page, headers={"ETag": '"v1"'})
+    httpx_mock.add_response(url=event_url, status_code=304, match_headers={"If-None-Match": '"v1"'})
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    with ResponseCache(tmp_path / "http") as cache:
+        async with Fetcher(cache=cache) as fetcher:
+            scraper = Scraper(fetcher, Parser(), mock_url)
+            scraper.events_dict = {"1": event_url}
+            with patch.object(db_handler, "save_event_data", side_effect=RuntimeError("disk full")):
+                with pytest.raises(ExceptionGroup):
+                    await scraper.scrape_to_db(db_handler, db_handler.get_event_hashes())
+            # the page is in the HTTP cache now, so the server answers 304 on the rerun
+            stats = await scraper.scrape_to_db(db_handler, db_handler.get_event_hashes())
+    assert stats.events_saved == 1
+    assert db_handler.get_event_hashes() == {"1": hashlib.sha256(event_page).hexdigest()}
+
+
+async def test_scraper_incremental_skips_unchanged_pages(
+    mock_url: str, mock_event_data: NFM_Event, mocker: MockerFixture
+) -> None:
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=lambda url: FetchResult(url, url.encode()))
+    scraper = Scraper(mock_fetcher, mock_parser, mock_url)
+    scraper.events_dict = {"1": f"{mock_url}/event/1", "2": f"{mock_url}/event/2"}
+    unchanged_hash = hashlib.sha256(f"{mock_url}/event/1".encode()).hexdigest()
+    scraped_events = await scraper.scrape({"1": unchanged_hash, "2": "outdated hash"})
+    assert list(scraped_events) == ["2"]
+    assert scraped_events["2"].content_hash == hashlib.sha256(f"{mock_url}/event/2".encode()).hexdigest()
+
+
+async def test_scraper_parses_in_process_pool(mock_url: str) -> None:
+    event_page = (Path(__file__).parent / "fixtures" / "event_page.html").read_bytes()
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(return_value=FetchResult(mock_url, event_page))
+    with ProcessPoolExecutor(1) as executor:
+        scraper = Scraper(mock_fetcher, Parser(), mock_url, executor=executor)
+        scraper.events_dict = {"1": f"{mock_url}/event/1"}
+        scraped_events = await scraper.scrape()
+    assert isinstance(scraped_events["1"], NFM_Event)
+    assert scraped_events["1"].location == "NFM, Main Hall"
+    assert scraped_events["1"].content_hash == hashlib.sha256(event_page).hexdigest()
+
+
+async def test_scraper_scrape_to_db_saves_in_batches(mock_url: str, mocker: MockerFixture) -> None:
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=lambda url: FetchResult(url, url.encode()))
+    mock_db_handler = mocker.Mock(spec=DatabaseHandler)
+    mock_db_handler.save_event_data.return_value = SaveStats(events=2)
+    scraper = Scraper(mock_fetcher, mock_parser, mock_url)
+    scraper.events_dict = {str(event_id): f"{mock_url}/event/{event_id}" for event_id in range(5)}
+    stats = await scraper.scrape_to_db(mock_db_handler, batch_size=2)
+    assert stats.events_saved == 5
+    assert stats.batches_written == 3
+    saved_ids = [event_id for call in mock_db_handler.save_event_data.call_args_list for event_id in call.args[0]]
+    assert sorted(saved_ids) == ["0", "1", "2", "3", "4"]
+
+
 async def test_run_scraper(mocker: MockerFixture) -> None:
     mock_parser = mocker.Mock(spec=Parser)
     mock_fetcher = AsyncMock(spec=Fetcher)
+    mock_fetcher.retry_policy = RetryPolicy()
     mock_db_handler = mocker.Mock(spec=DatabaseHandler)
     mocker.patch("nfmer.scraper.Parser", return_value=mock_parser)
     mocker.patch("nfmer.scraper.Fetcher", return_value=mock_fetcher)
     mocker.patch("nfmer.scraper.DatabaseHandler", return_value=mock_db_handler)
-    mock_scraped_events = {"1": mock_event_data}
     mock_scraper = AsyncMock(spec=Scraper)
-    mock_scraper.scrape = AsyncMock(return_value=mock_scraped_events)
+    mock_scraper.scrape_to_db = AsyncMock(return_value=PipelineStats(Counter({OutcomeStatus.PARSED: 1})))
+    mock_scraper.events_dict = {"1": "https://fake-url.com/events/event/1"}
     mock_initialise = mocker.patch(
         "nfmer.scraper.Scraper.initialise",
         new_callable=mocker.AsyncMock,
         return_value=mock_scraper,
     )
     await run_scraper()
-    mock_initialise.assert_called_once_with(mock_fetcher, mock_parser)
-    mock_scraper.scrape.assert_called_once()
-    mock_db_handler.save_event_data.assert_called_once_with(mock_scraped_events)
+    mock_initialise.assert_called_once_with(mock_fetcher, mock_parser, executor=ANY)
+    mock_scraper.scrape_to_db.assert_called_once_with(mock_db_handler, None)
+    mock_db_handler.refresh_read_models.assert_called_once_with()
+    mock_db_handler.restore_listed_events.assert_called_once_with(mock_scraper.events_dict)
+    mock_db_handler.tombstone_missing_events.assert_called_once_with(mock_scraper.events_dict)
+    mock_db_handler.get_event_hashes.assert_not_called()
+
+
+async def test_run_scraper_restores_relisted_unchanged_events(
+    mock_url: str, mock_event_data: NFM_Event, mocker: MockerFixture, tmp_path: Path
+) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    mock_event_data.date = date(2999, 1, 1)
+    mock_event_data.content_hash = hashlib.sha256(b"<html></html>").hexdigest()
+    db_handler.save_event_data({"1": mock_event_data, "2": mock_event_data})
+    db_handler.refresh_read_models()
+    db_handler.tombstone_missing_events(["2"])
+    version = db_handler.get_data_version()
+    mock_fetcher = AsyncMock(spec=Fetcher)
+    mock_fetcher.retry_policy = RetryPolicy()
+    mock_fetcher.fetch = AsyncMock(return_value=FetchResult(mock_url, b"<html></html>", not_modified=True))
+    mocker.patch("nfmer.scraper.Fetcher", return_value=mock_fetcher)
+    mocker.patch("nfmer.scraper.DatabaseHandler", return_value=db_handler)
+    scraper = Scraper(mock_fetcher, Parser(), mock_url)
+    scraper.events_dict = {"1": f"{mock_url}/event/1", "2": f"{mock_url}/event/2"}
+    mocker.patch("nfmer.scraper.Scraper.initialise", new_callable=mocker.AsyncMock, return_value=scraper)
+    await run_scraper(incremental=True, parse_workers=0)
+    event = db_handler.get_event_by_id("1")
+    assert event is not None
+    assert not event.tombstoned  # listed again, but its unchanged page was never saved again
+    assert db_handler.get_data_version() == version + 1
+
+
+async def test_run_scraper_does_not_tombstone_on_empty_listing(mocker: MockerFixture) -> None:
+    mock_fetcher = AsyncMock(spec=Fetcher)
+    mock_fetcher.retry_policy = RetryPolicy()
+    mock_db_handler = mocker.Mock(spec=DatabaseHandler)
+    mocker.patch("nfmer.scraper.Fetcher", return_value=mock_fetcher)
+    mocker.patch("nfmer.scraper.DatabaseHandler", return_value=mock_db_handler)
+    mock_scraper = AsyncMock(spec=Scraper)
+    mock_scraper.scrape_to_db = AsyncMock(return_value=PipelineStats())
+    mock_scraper.events_dict = {}
+    mocker.patch("nfmer.scraper.Scraper.initialise", new_callable=mocker.AsyncMock, return_value=mock_scraper)
+    await run_scraper(parse_workers=0)
+    mock_db_handler.tombstone_missing_events.assert_not_called()
@@ -0,0 +1,87 @@
+from multiprocessing import Process
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from nfmer.db_handler import DatabaseHandler, SaveStats
+from nfmer.models import NFM_Event
+from nfmer.scraper.fetcher import FetcherException, FetchResult
+from utils.historical_scraper import (
+    PARTITION_SIZE,
+    HistoricalScraper,
+    pending_event_ids,
+)
+
+
+def test_pending_event_ids_resume_after_a_partial_run(tmp_path: Path) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    # the first run went from 10 down to 5 before it stopped
+    db_handler.save_backfill_progress(done_ids=[10, 9, 6], not_found_ids=[8, 7], failures={5: "timeout"})
+    pending = pending_event_ids(12, db_handler.get_backfill_ranges(), db_handler.get_backfill_failures())
+    # the failure is retried first, then the newer ids listed since, then the rest
+    assert list(pending) == [5, 12, 11, 4, 3, 2, 1]
+
+
+def test_pending_event_ids_stop_retrying_after_max_attempts(tmp_path: Path) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    db_handler.save_backfill_progress(done_ids=[6], not_found_ids=[], failures={5: "timeout", 3: "timeout"})
+    db_handler.save_backfill_progress(done_ids=[], not_found_ids=[], failures={5: "timeout"})
+    failures = db_handler.get_backfill_failures()
+    assert failures == {5: 2, 3: 1}
+    ranges = db_handler.get_backfill_ranges()
+    assert list(pending_event_ids(6, ranges, failures, max_attempts=2)) == [3, 4, 2, 1]
+    assert list(pending_event_ids(6, ranges, failures, max_attempts=3)) == [5, 3, 4, 2, 1]
+
+
+@pytest.mark.parametrize("worker_count", [1, 2, 3])
+def test_pending_event_ids_split_disjointly_between_workers(worker_count: int) -> None:
+    start_id = 3 * PARTITION_SIZE + 17
+    finished_ranges = [(100, 250), (PARTITION_SIZE + 1, 2 * PARTITION_SIZE + 5)]
+    failures = {120: 1, 2 * PARTITION_SIZE + 100: 1, 7: 5}
+    shares = [
+        list(pending_event_ids(start_id, finished_ranges, failures, 3, worker_index, worker_count))
+        for worker_index in range(worker_count)
+    ]
+    expected = {event_id for event_id in range(1, start_id + 1) if event_id != 7}  # 7 is out of attempts
+    expected -= {event_id for start, end in finished_ranges for event_id in range(start, end + 1)}
+    expected |= {120}
+    assert sum(len(share) for share in shares) == len(expected)  # nobody gets an id twice
+    assert set().union(*shares) == expected
+    for worker_index, share in enumerate(shares):
+        assert {(event_id - 1) // PARTITION_SIZE % worker_count for event_id in share} <= {worker_index}
+
+
+def test_workers_can_start_together_on_an_empty_database(tmp_path: Path) -> None:
+    db_path = f"sqlite:///{tmp_path / 'events.db'}"
+    # every worker process starts by opening (and so migrating) the shared database
+    workers = [Process(target=DatabaseHandler, args=(db_path,)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * len(workers)
+    assert DatabaseHandler(db_path).get_backfill_ranges() == []
+
+
+async def test_probed_pages_are_not_downloaded_again(mocker: MockerFixture) -> None:
+    def fetch(url: str) -> FetchResult:
+        if url.endswith("/4"):
+            raise FetcherException("Not found", "GET", 404)
+        return FetchResult(url, url.encode())
+
+    mock_fetcher = AsyncMock()
+    mock_fetcher.fetch = AsyncMock(side_effect=fetch)
+    mock_parser = mocker.Mock()
+    mock_parser.parse_content.side_effect = lambda url, content: NFM_Event(url=url)
+    mock_db_handler = mocker.Mock(spec=DatabaseHandler)
+    mock_db_handler.save_event_data.return_value = SaveStats(events=2)
+    scraper = HistoricalScraper(mock_fetcher, mock_parser, "https://fake-url.com")
+    assert await scraper.probe(5)
+    assert not await scraper.probe(4)
+    stats = await scraper.scrape_to_db([5, 3], mock_db_handler)
+    assert stats.events_saved == 2
+    fetched = [call.args[0] for call in mock_fetcher.fetch.call_args_list]
+    assert fetched == ["https://fake-url.com/event/5", "https://fake-url.com/event/4", "https://fake-url.com/event/3"]
+    assert scraper.probed_pages == {}
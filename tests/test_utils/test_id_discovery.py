@@ -0,0 +1,49 @@
+import pytest
+
+from utils.id_discovery import IdSpaceExplorer, Probe
+
+
+def fake_probe(existing: set[int], probed: list[int]) -> Probe:
+    async def probe(event_id: int) -> bool:
+        probed.append(event_id)
+        return event_id in existing
+
+    return probe
+
+
+async def test_explorer_schedules_dense_blocks_first_and_skips_empty_ones() -> None:
+    existing = set(range(1, 101)) | set(range(102, 201, 2))  # full, half full and (201-300) empty blocks
+    probed: list[int] = []
+    explorer = IdSpaceExplorer(fake_probe(existing, probed), block_size=100, initial_samples=4, max_samples=32)
+    event_ids = list(range(300, 0, -1))
+    plan = await explorer.explore(event_ids)
+    assert plan.event_ids[:100] == list(range(100, 0, -1))
+    half_block_misses = [event_id for event_id in probed if 100 < event_id <= 200 and event_id not in existing]
+    assert plan.event_ids[100:] == [event_id for event_id in range(200, 100, -1) if event_id not in half_block_misses]
+    empty_block_probes = [event_id for event_id in probed if event_id > 200]
+    assert 32 <= len(empty_block_probes) < 100  # resampled up to max_samples, then given up
+    assert sorted(plan.misses) == sorted(half_block_misses + empty_block_probes)
+    assert sorted(plan.skipped) == sorted(set(range(201, 301)) - set(empty_block_probes))
+    assert sorted(plan.event_ids + plan.misses + plan.skipped) == sorted(event_ids)
+    assert len(probed) == len(set(probed)) == explorer.stats.probes
+    assert (explorer.stats.blocks_scheduled, explorer.stats.blocks_skipped) == (2, 1)
+    assert (explorer.stats.ids_scheduled, explorer.stats.ids_skipped) == (len(plan.event_ids), len(plan.skipped))
+
+
+async def test_explorer_resamples_until_it_hits() -> None:
+    probed: list[int] = []
+    explorer = IdSpaceExplorer(fake_probe({94}, probed), block_size=100, initial_samples=4, max_samples=32)
+    plan = await explorer.explore(list(range(100, 0, -1)))
+    assert probed[:4] == [88, 63, 38, 13]  # evenly spread over the block, none of them exists
+    assert 94 in probed[4:]
+    assert 94 in plan.event_ids
+    assert explorer.stats.blocks_skipped == 0
+
+
+@pytest.mark.parametrize("block_size, blocks", [(100, 3), (250, 2), (1000, 1)])
+def test_explorer_splits_ids_into_blocks(block_size: int, blocks: int) -> None:
+    explorer = IdSpaceExplorer(fake_probe(set(), []), block_size=block_size)
+    id_blocks = explorer._blocks(list(range(300, 0, -1)))
+    assert len(id_blocks) == blocks
+    assert all(block.ids == sorted(block.ids, reverse=True) for block in id_blocks)
+    assert all(len({(event_id - 1) // block_size for event_id in block.ids}) == 1 for block in id_blocks)
@@ -0,0 +1,52 @@
+from collections import Counter
+from pathlib import Path
+
+from nfmer.db_handler import DatabaseHandler
+from utils.synthetic_data import (
+    CorpusShape,
+    composer_name,
+    composition_names,
+    generate_events,
+    populate,
+    zipf_cum_weights,
+)
+
+
+def test_generate_events_is_deterministic_for_a_seed() -> None:
+    first = list(generate_events(200, seed=7))
+    assert first == list(generate_events(200, seed=7))
+    assert first != list(generate_events(200, seed=8))
+    assert [event_id for event_id, _ in generate_events(3, first_id=41)] == ["41", "42", "43"]
+
+
+def test_generated_events_are_well_formed() -> None:
+    shape = CorpusShape(composers=50)
+    works = {composer_name(rank): composition_names(rank, shape.max_works) for rank in range(1, 51)}
+    events = list(generate_events(500, shape))
+    assert [event.date for _, event in events] == sorted(event.date for _, event in events)
+    for _, event in events:
+        assert 1 <= len(event.event_programme) <= shape.programme_size[1]
+        assert all(work in works[composer] for composer, work in event.event_programme.items())
+
+
+def test_composer_popularity_follows_zipf() -> None:
+    shape = CorpusShape(composers=200)
+    appearances = Counter(
+        composer for _, event in generate_events(5000, shape, seed=1) for composer in event.event_programme
+    )
+    cum_weights = zipf_cum_weights(shape.composers, shape.zipf_exponent)
+    total = sum(appearances.values())
+    for rank in (1, 2, 10):
+        expected = (cum_weights[rank - 1] - (cum_weights[rank - 2] if rank > 1 else 0)) / cum_weights[-1]
+        assert abs(appearances[composer_name(rank)] / total - expected) < expected * 0.25
+    assert appearances[composer_name(1)] > 10 * appearances[composer_name(50)]
+
+
+def test_populate_saves_every_event(tmp_path: Path) -> None:
+    db_handler = DatabaseHandler(f"sqlite:///{tmp_path / 'events.db'}")
+    stats = populate(db_handler, 250, CorpusShape(composers=30), batch_size=100)
+    assert stats.events == 250
+    assert len(db_handler.get_event_hashes()) == 250
+    assert stats.composers_created == len(db_handler.get_all_composers())
+    assert db_handler.get_composer_detail(1) is not None  # the read models are built at the end
+    assert db_handler.refresh_read_models() == 0
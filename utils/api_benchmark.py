@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import httpx
+from loguru import logger
+
+from nfmer.db_handler import DatabaseHandler
+from nfmer.models import NFM_Event
+
+
+def populate(db_path: Path, composers: int, compositions_per_composer: int) -> None:
+    events = {
+        str(event_id): NFM_Event(
+            url=f"https://fake-url.com/event/{event_id}",
+            event_programme={
+                f"Composer {event_id}": f"Composition {number}" for number in range(compositions_per_composer)
+            },
+            location="Main Hall",
+            date=date(2024, 1, 1),
+            hour="19:00",
+        )
+        for event_id in range(1, composers + 1)
+    }
+    db_handler = DatabaseHandler(f"sqlite:///{db_path}")
+    db_handler.save_event_data(events)
+    db_handler.refresh_read_models()
+
+
+async def run(path: str, requests: int, concurrency: int, composers: int) -> float:
+    """Sends ``requests`` GETs (``{id}`` in ``path`` cycles through the composers), returns requests/s"""
+    # imported late, so it picks up the database settings from the env
+    from nfmer.api.v1.api import api
+
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for number in range(requests):
+        queue.put_nowait(path.format(id=number % composers + 1))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            response = await client.get(queue.get_nowait())
+            response.raise_for_status()
+
+    async with api.router.lifespan_context(api):
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            await client.get(path.format(id=1))  # warm-up
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Measure API requests/s against a generated database")
+    arg_parser.add_argument("--path", default="/composers/{id}", help="endpoint to hit, {id} is a composer id")
+    arg_parser.add_argument("--requests", type=int, default=2000)
+    arg_parser.add_argument("--concurrency", type=int, default=20)
+    arg_parser.add_argument("--composers", type=int, default=500)
+    arg_parser.add_argument("--compositions", type=int, default=5, help="compositions per composer")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "events.db"
+        populate(db_path, args.composers, args.compositions)
+        os.environ["NFMER_DB_URL"] = f"sqlite:///{db_path}"
+        requests_per_second = asyncio.run(run(args.path, args.requests, args.concurrency, args.composers))
+    logger.info(
+        f"{args.path}: {args.requests} requests at concurrency {args.concurrency}: {requests_per_second:.0f} req/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
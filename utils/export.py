@@ -0,0 +1,48 @@
+import argparse
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from nfmer.db_handler import DatabaseHandler
+from nfmer.db_handler.export import ExportFormat, ExportTable
+
+
+def export_database(db_path: str, output_dir: Path, export_format: ExportFormat, tables: list[ExportTable]) -> None:
+    """Writes every table into ``output_dir/<table>.<format>``, streaming it chunk by chunk"""
+    db_handler = DatabaseHandler(db_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for table in tables:
+        started = time.perf_counter()
+        output_path = output_dir / f"{table.value}.{export_format.value}"
+        with output_path.open("w", encoding="utf-8", newline="") as output:
+            for chunk in db_handler.export(table, export_format):
+                output.write(chunk)
+        size = output_path.stat().st_size
+        seconds = time.perf_counter() - started
+        logger.info(f"Exported {table.value} to {output_path}: {size / 2**20:.1f} MiB in {seconds:.2f}s")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Dump the catalogue as NDJSON or CSV files")
+    arg_parser.add_argument("output_dir", type=Path, help="directory the files are written to")
+    arg_parser.add_argument("--db", default="sqlite:///events.db", help="database URL")
+    arg_parser.add_argument(
+        "--format",
+        type=ExportFormat,
+        choices=[export_format.value for export_format in ExportFormat],
+        default=ExportFormat.NDJSON,
+    )
+    arg_parser.add_argument(
+        "--table",
+        type=ExportTable,
+        choices=[table.value for table in ExportTable],
+        action="append",
+        help="table to export, can be repeated (default: all of them)",
+    )
+    args = arg_parser.parse_args()
+    export_database(args.db, args.output_dir, args.format, args.table or list(ExportTable))
+
+
+if __name__ == "__main__":
+    main()
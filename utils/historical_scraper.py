@@ -1,22 +1,77 @@
+import argparse
 import asyncio
-from asyncio import Semaphore
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import Process
+from typing import Iterable, Iterator
 
 from loguru import logger
 
 from nfmer.db_handler import DatabaseHandler
-from nfmer.models import NFM_Event
-from nfmer.scraper.fetcher import Fetcher, FetcherException
+from nfmer.scraper.fetcher import Fetcher, FetcherException, FetchResult
 from nfmer.scraper.parser import Parser
+from nfmer.scraper.pipeline import (
+    OutcomeStatus,
+    PipelineStats,
+    ScrapeOutcome,
+    ScrapePipeline,
+)
+from utils.id_discovery import IdSpaceExplorer
 
 NFM_URL = "https://www.nfm.wroclaw.pl/en/component/nfmcalendar"
+PARTITION_SIZE = 1000  # ids are dealt out to parallel workers in blocks of this size
+DONE_STATUSES = (OutcomeStatus.PARSED, OutcomeStatus.UNCHANGED)
+
+
+def pending_event_ids(
+    start_id: int,
+    finished_ranges: list[tuple[int, int]],
+    failures: dict[int, int],
+    max_attempts: int = 3,
+    worker_index: int = 0,
+    worker_count: int = 1,
+) -> Iterator[int]:
+    """Yields the ids (newest first) this worker still has to scrape.
+
+    Ids covered by ``finished_ranges`` (sorted, merged) are skipped, failed ids are retried
+    first as long as they have attempts left.
+    """
+
+    def owned(event_id: int) -> bool:
+        return ((event_id - 1) // PARTITION_SIZE) % worker_count == worker_index
+
+    yield from (
+        event_id
+        for event_id, attempts in sorted(failures.items(), reverse=True)
+        if attempts < max_attempts and owned(event_id)
+    )
+    event_id = start_id
+    for range_start, range_end in reversed(finished_ranges):
+        for pending_id in range(event_id, range_end, -1):
+            if owned(pending_id) and pending_id not in failures:
+                yield pending_id
+        event_id = min(event_id, range_start - 1)
+    for pending_id in range(event_id, 0, -1):
+        if owned(pending_id) and pending_id not in failures:
+            yield pending_id
 
 
 class HistoricalScraper:
-    def __init__(self, fetcher: Fetcher, parser: Parser, main_url: str, max_concurrent: int = 10):
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        parser: Parser,
+        main_url: str,
+        max_concurrent: int = 10,
+        executor: Executor | None = None,
+    ):
         self.fetcher = fetcher
         self.parser = parser
         self.main_url = main_url
-        self.semaphore = Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.executor = executor
+        # pages downloaded by probe, by URL; scrape_to_db uses them instead of downloading them again
+        self.probed_pages: dict[str, FetchResult] = {}
 
     async def get_starting_event_id(self) -> int:
         soup = await self.fetcher.fetch_soup(self.main_url)
@@ -36,66 +91,177 @@ class HistoricalScraper:
                 continue
         return int(min_id)
 
-    async def scrape_single_event(self, event_id: int) -> tuple[str, NFM_Event | None]:
-        async with self.semaphore:
-            event_url = f"{self.main_url}/event/{event_id}"
-            try:
-                event_soup = await self.fetcher.fetch_soup(event_url)
-                return str(event_id), self.parser.parse(event_url, event_soup)
-            except FetcherException:
-                return str(event_id), None
-            except Exception:
-                return str(event_id), None
-
-    async def scrape_chunk(self, event_ids: list[int]) -> dict[str, NFM_Event]:
-        tasks = [self.scrape_single_event(event_id) for event_id in event_ids]
-        results = {}
-        for event_id, data in await asyncio.gather(*tasks):
-            if data is not None:
-                results[event_id] = data
-        return results
+    async def probe(self, event_id: int) -> bool:
+        """Checks whether an event exists; errors other than a 404 count as a hit so the id isn't lost"""
+        url = f"{self.main_url}/event/{event_id}"
+        try:
+            self.probed_pages[url] = await self.fetcher.fetch(url)
+        except FetcherException as e:
+            return e.error_code != 404
+        except Exception:
+            return True
+        return True
+
+    def event_jobs(self, event_ids: Iterable[int]) -> Iterator[tuple[str, str]]:
+        for event_id in event_ids:
+            yield str(event_id), f"{self.main_url}/event/{event_id}"
+
+    async def scrape_to_db(
+        self, event_ids: Iterable[int], db_handler: DatabaseHandler, batch_size: int = 100
+    ) -> PipelineStats:
+        """Streams the given event ids through fetch -> parse -> DB, committing every ``batch_size`` ids"""
+        progress = {"processed": 0, "saved": 0}
+
+        def save(batch: list[ScrapeOutcome]) -> None:
+            events = {outcome.event_id: outcome.event for outcome in batch if outcome.event is not None}
+            if events:
+                save_stats = db_handler.save_event_data(events)
+                logger.info(f"Saved {save_stats.rows} rows at {save_stats.rows_per_second:.0f} rows/s")
+            else:
+                logger.debug("No valid events in this batch")
+            # checkpoint only once the events are committed, a crash in between just repeats the batch
+            db_handler.save_backfill_progress(
+                done_ids=[int(o.event_id) for o in batch if o.status in DONE_STATUSES],
+                not_found_ids=[int(o.event_id) for o in batch if o.status == OutcomeStatus.NOT_FOUND],
+                failures={int(o.event_id): o.error for o in batch if o.status == OutcomeStatus.FAILED},
+            )
+            progress["processed"] += len(batch)
+            progress["saved"] += len(events)
+            logger.info(f"Progress: {progress['processed']} events processed, {progress['saved']} saved to DB")
+
+        pipeline = ScrapePipeline(
+            self.fetcher,
+            self.parser,
+            save,
+            executor=self.executor,
+            prefetched=self.probed_pages,
+            fetch_workers=self.max_concurrent,
+            batch_size=batch_size,
+        )
+        return await pipeline.run(self.event_jobs(event_ids))
 
 
 async def run_historical_scraper(
     db_path: str = "sqlite:///historical_events.db",
-    chunk_size: int = 100
+    batch_size: int = 100,
+    parse_workers: int | None = None,
+    max_attempts: int = 3,
+    worker_index: int = 0,
+    worker_count: int = 1,
+    discover: bool = False,
 ) -> None:
+    """Backfills all events from the newest one down to id 1, resuming from the stored checkpoints.
+
+    With ``worker_count`` > 1 the id space is split in blocks between workers (processes or
+    separate machines sharing the database), this one handles the blocks of ``worker_index``.
+    With ``discover`` the id space is sampled first and ranges that look empty are left for a later run.
+    """
     fetcher = Fetcher()
     parser = Parser()
-    scraper = HistoricalScraper(fetcher, parser, NFM_URL)
+    executor = ProcessPoolExecutor(parse_workers)
+    scraper = HistoricalScraper(fetcher, parser, NFM_URL, executor=executor)
     db_handler = DatabaseHandler(db_path)
+    db_handler.warm_identity_cache()
+    worker = f"Worker {worker_index + 1}/{worker_count}"
 
-    logger.info("Detecting starting event ID from main page...")
-    start_id = await scraper.get_starting_event_id()
-    logger.info(f"Starting from event ID: {start_id}")
-    logger.info(f"Scraping events from {start_id} down to 1 in chunks of {chunk_size}...")
-
-    total_events = start_id
-    total_saved = 0
-    events_processed = 0
+    with executor:
+        async with fetcher:
+            logger.info(f"{worker}: detecting starting event ID from main page...")
+            start_id = await scraper.get_starting_event_id()
+            finished_ranges = db_handler.get_backfill_ranges()
+            failures = db_handler.get_backfill_failures()
+            logger.info(
+                f"{worker}: scraping events from {start_id} down to 1, saving every {batch_size} events, "
+                f"{sum(end - start + 1 for start, end in finished_ranges)} ids already done, "
+                f"{len(failures)} failed before"
+            )
+            event_ids: Iterable[int] = pending_event_ids(
+                start_id, finished_ranges, failures, max_attempts, worker_index, worker_count
+            )
+            probes = reused = 0
+            if discover:
+                explorer = IdSpaceExplorer(scraper.probe, max_concurrent=scraper.max_concurrent)
+                plan = await explorer.explore(list(event_ids))
+                db_handler.save_backfill_progress(done_ids=[], not_found_ids=plan.misses, failures={})
+                discovery = explorer.stats
+                logger.info(
+                    f"{worker}: {discovery.probes} probes found {discovery.hits} events, "
+                    f"scheduling {discovery.ids_scheduled} ids in {discovery.blocks_scheduled} blocks, "
+                    f"skipping {discovery.ids_skipped} ids in {discovery.blocks_skipped} blocks that look empty"
+                )
+                event_ids = plan.event_ids
+                probes = discovery.probes
+                reused = len(scraper.probed_pages)
+            stats = await scraper.scrape_to_db(event_ids, db_handler, batch_size)
+            reused -= len(scraper.probed_pages)
+    refreshed = db_handler.refresh_read_models()
 
-    for chunk_start in range(start_id, 0, -chunk_size):
-        chunk_end = max(chunk_start - chunk_size + 1, 1)
-        event_ids = list(range(chunk_start, chunk_end - 1, -1))
+    fetches = sum(stats.outcomes.values()) + probes - reused
+    logger.success(f"{worker}: historical scraping completed! Saved {stats.events_saved} events in {fetches} fetches")
+    logger.info(f"{worker}: requests: {fetcher.retry_policy.stats.summary()}")
+    logger.info(f"{worker}: rebuilt the details of {refreshed} compositions")
 
-        logger.info(f"Scraping chunk: events {chunk_start} to {chunk_end} ({len(event_ids)} events)")
-        scraped_events = await scraper.scrape_chunk(event_ids)
 
-        if scraped_events:
-            logger.info(f"Scraped {len(scraped_events)} valid events, saving to database...")
-            db_handler.save_event_data(scraped_events)
-            total_saved += len(scraped_events)
-        else:
-            logger.debug("No valid events in this chunk")
-
-        events_processed += len(event_ids)
-        logger.info(f"Progress: {events_processed}/{total_events} events processed, {total_saved} saved to DB")
-
-    logger.success(f"Historical scraping completed! Total events saved: {total_saved}")
+def _run_worker(
+    db_path: str,
+    batch_size: int,
+    parse_workers: int | None,
+    max_attempts: int,
+    worker_index: int,
+    worker_count: int,
+    discover: bool,
+) -> None:
+    asyncio.run(
+        run_historical_scraper(db_path, batch_size, parse_workers, max_attempts, worker_index, worker_count, discover)
+    )
 
 
 def main() -> None:
-    asyncio.run(run_historical_scraper())
+    arg_parser = argparse.ArgumentParser(description="Backfill the whole NFM event history into a database")
+    arg_parser.add_argument("--db", default="sqlite:///historical_events.db", help="database URL")
+    arg_parser.add_argument("--batch-size", type=int, default=100, help="events written (and checkpointed) at once")
+    arg_parser.add_argument("--max-attempts", type=int, default=3, help="how many times a failing id is tried")
+    arg_parser.add_argument("--processes", type=int, default=1, help="worker processes to start on this machine")
+    arg_parser.add_argument(
+        "--worker-index",
+        type=int,
+        default=0,
+        help="index of this instance when several instances share the database",
+    )
+    arg_parser.add_argument("--worker-count", type=int, default=1, help="number of instances sharing the database")
+    arg_parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="sample the id space first and skip ranges without events (run again without it to cover them)",
+    )
+    args = arg_parser.parse_args()
+    if not 0 <= args.worker_index < args.worker_count:
+        arg_parser.error("--worker-index must be between 0 and --worker-count - 1")
+
+    # every local process becomes a separate worker of the instance's share of the id space
+    worker_count = args.worker_count * args.processes
+    parse_workers = max(1, (os.cpu_count() or 1) // args.processes)
+    processes = [
+        Process(
+            target=_run_worker,
+            args=(
+                args.db,
+                args.batch_size,
+                parse_workers,
+                args.max_attempts,
+                worker_index,
+                worker_count,
+                args.discover,
+            ),
+        )
+        for worker_index in range(args.worker_index * args.processes, (args.worker_index + 1) * args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    if any(process.exitcode != 0 for process in processes):
+        raise SystemExit("Some of the backfill workers failed, run the backfill again to resume")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+Probe = Callable[[int], Awaitable[bool]]
+
+
+@dataclass
+class IdBlock:
+    ids: list[int]  # pending ids of the block, newest first
+    probed: dict[int, bool] = field(default_factory=dict)  # id -> does the event exist
+
+    @property
+    def hits(self) -> int:
+        return sum(self.probed.values())
+
+    @property
+    def density(self) -> float:
+        """Estimated share of ids in the block that are valid events"""
+        return self.hits / len(self.probed) if self.probed else 0.0
+
+    def sample(self, samples: int) -> list[int]:
+        """Evenly spread ids not probed yet; doubling ``samples`` bisects the gaps of the previous round"""
+        count = len(self.ids)
+        picked = {self.ids[int((index + 0.5) * count / samples)] for index in range(min(samples, count))}
+        return sorted(picked - self.probed.keys(), reverse=True)
+
+
+@dataclass
+class DiscoveryStats:
+    probes: int = 0
+    hits: int = 0
+    blocks_scheduled: int = 0
+    blocks_skipped: int = 0
+    ids_scheduled: int = 0
+    ids_skipped: int = 0
+
+
+@dataclass
+class DiscoveryPlan:
+    event_ids: list[int] = field(default_factory=list)  # ids to fetch, densest blocks first
+    misses: list[int] = field(default_factory=list)  # probed ids that don't exist
+    skipped: list[int] = field(default_factory=list)  # unprobed ids of blocks that look empty
+
+
+class IdSpaceExplorer:
+    """Finds where in a sparse id space events exist, before fetching ids one by one.
+
+    Every block of ``block_size`` ids gets ``initial_samples`` probes; blocks without a hit are
+    probed again with twice as many samples, up to ``max_samples``, and are skipped if they still
+    look empty. Blocks with hits are scheduled in full, densest first.
+    """
+
+    def __init__(
+        self,
+        probe: Probe,
+        block_size: int = 500,
+        initial_samples: int = 4,
+        max_samples: int = 32,
+        max_concurrent: int = 10,
+    ):
+        self.probe = probe
+        self.block_size = block_size
+        self.initial_samples = initial_samples
+        self.max_samples = max_samples
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.stats = DiscoveryStats()
+
+    def _blocks(self, event_ids: list[int]) -> list[IdBlock]:
+        blocks: dict[int, IdBlock] = {}
+        for event_id in event_ids:
+            blocks.setdefault((event_id - 1) // self.block_size, IdBlock([])).ids.append(event_id)
+        return list(blocks.values())
+
+    async def _probe(self, block: IdBlock, event_id: int) -> None:
+        async with self.semaphore:
+            block.probed[event_id] = await self.probe(event_id)
+        self.stats.probes += 1
+        self.stats.hits += block.probed[event_id]
+
+    async def explore(self, event_ids: list[int]) -> DiscoveryPlan:
+        """Probes the blocks of ``event_ids`` and plans which ids are worth fetching"""
+        blocks = self._blocks(event_ids)
+        undecided = blocks
+        samples = self.initial_samples
+        while undecided:
+            await asyncio.gather(
+                *(self._probe(block, event_id) for block in undecided for event_id in block.sample(samples))
+            )
+            logger.info(f"Discovery: {samples} samples per block, {self.stats.hits}/{self.stats.probes} probes hit")
+            undecided = [block for block in undecided if not block.hits and len(block.probed) < len(block.ids)]
+            if samples >= self.max_samples:
+                break
+            samples *= 2
+        return self._plan(blocks)
+
+    def _plan(self, blocks: list[IdBlock]) -> DiscoveryPlan:
+        plan = DiscoveryPlan()
+        for block in blocks:
+            plan.misses.extend(event_id for event_id, exists in block.probed.items() if not exists)
+        live = sorted((block for block in blocks if block.hits), key=lambda block: block.density, reverse=True)
+        for block in live:
+            plan.event_ids.extend(event_id for event_id in block.ids if block.probed.get(event_id, True))
+        for block in blocks:
+            if not block.hits:
+                plan.skipped.extend(event_id for event_id in block.ids if event_id not in block.probed)
+        self.stats.blocks_scheduled = len(live)
+        self.stats.blocks_skipped = len(blocks) - len(live)
+        self.stats.ids_scheduled = len(plan.event_ids)
+        self.stats.ids_skipped = len(plan.skipped)
+        return plan
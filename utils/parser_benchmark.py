@@ -0,0 +1,79 @@
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from nfmer.models import NFM_Event
+from nfmer.scraper.cache import CACHE_FILENAME, ResponseCache
+from nfmer.scraper.parser import PARSER_BACKENDS, Parser
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    pages: int
+    seconds: float
+    peak_memory: int
+    events: list[NFM_Event | None]
+
+    @property
+    def ms_per_page(self) -> float:
+        return self.seconds / self.pages * 1000 if self.pages else 0.0
+
+
+def load_corpus(path: Path) -> list[tuple[str, bytes]]:
+    """Reads event pages either from a scraper --cache-dir or from a directory of *.html files"""
+    if (path / CACHE_FILENAME).exists():
+        with ResponseCache(path) as cache:
+            return [(response.url, response.content) for response in cache.items() if "/event/" in response.url]
+    return [(str(page), page.read_bytes()) for page in sorted(path.glob("*.html"))]
+
+
+def benchmark(corpus: list[tuple[str, bytes]], backend: str, strain: bool, repeat: int) -> BenchmarkResult:
+    parser = Parser(backend, strain=strain)
+    events = [parser.parse_content(url, content) for url, content in corpus]  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for url, content in corpus:
+            parser.parse_content(url, content)
+    seconds = time.perf_counter() - started
+    # measured on a separate pass, tracemalloc slows the parsing down too much to time it
+    peak_memory = 0
+    for url, content in corpus:
+        tracemalloc.start()
+        parser.parse_content(url, content)
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    name = f"{backend}{' (strained)' if strain else ''}"
+    return BenchmarkResult(name, len(corpus) * repeat, seconds, peak_memory, events)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Compare parse time and peak memory of the parser backends")
+    arg_parser.add_argument("corpus", type=Path, help="scraper --cache-dir or a directory of event *.html pages")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        logger.error(f"No event pages found in {args.corpus}")
+        return
+    logger.info(f"Parsing {len(corpus)} pages {args.repeat} times per backend")
+
+    results = [
+        benchmark(corpus, backend, strain, args.repeat) for backend in PARSER_BACKENDS for strain in (False, True)
+    ]
+    reference = next(result for result in results if result.name == "html.parser")
+    for result in results:
+        mismatches = sum(event != expected for event, expected in zip(result.events, reference.events))
+        logger.info(
+            f"{result.name:<24} {result.ms_per_page:8.2f} ms/page "
+            f"{result.peak_memory / 1024:10.0f} KiB peak per page, {mismatches} mismatches vs html.parser"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import bisect
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import cache
+from typing import Iterator, Sequence
+
+from loguru import logger
+
+from nfmer.db_handler import DatabaseHandler, SaveStats
+from nfmer.models import NFM_Event
+
+SYLLABLES = ["an", "to", "nín", "dvo", "řák", "mo", "zart", "be", "et", "ho", "ven", "lu", "tos", "ław", "szy", "ma"]
+SYLLABLES += ["no", "wski", "gó", "rec", "ki", "bach", "han", "del", "sme", "ta", "na", "ü", "ber", "ça", "ise"]
+FORMS = ["Symphony", "Piano Concerto", "String Quartet", "Overture", "Sonata", "Suite", "Violin Concerto", "Mass"]
+LOCATIONS = ["Main Hall", "Red Hall", "Black Hall", "Chamber Hall", "Cathedral", "Opera House", "Town Hall"]
+HOURS = ["19:00:00", "18:00:00", "19:30:00", "20:00:00", "11:00:00", "17:00:00"]
+
+
+@dataclass(frozen=True)
+class CorpusShape:
+    """What the generated catalogue looks like; popularity of composers, works and halls follows Zipf's law"""
+
+    composers: int = 2000
+    max_works: int = 80  # of the most popular composer, the n-th one has about max_works / sqrt(n)
+    zipf_exponent: float = 1.1
+    programme_size: tuple[int, int] = (1, 5)
+    start: date = date(2000, 1, 1)
+    events_per_day: float = 1.5
+
+
+@cache
+def zipf_cum_weights(size: int, exponent: float) -> list[float]:
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, size + 1)))
+
+
+def zipf_pick(rng: random.Random, items: Sequence[str], exponent: float) -> str:
+    cum_weights = zipf_cum_weights(len(items), exponent)
+    return items[bisect.bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def composer_name(rank: int) -> str:
+    rng = random.Random(rank)
+    first = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).capitalize()
+    last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).capitalize()
+    return f"{first} {last}"
+
+
+def composition_names(rank: int, max_works: int) -> list[str]:
+    works = max(3, int(max_works / rank**0.5))
+    return [f"{FORMS[(number + rank) % len(FORMS)]} No. {number // len(FORMS) + 1}" for number in range(works)]
+
+
+def generate_events(
+    count: int, shape: CorpusShape = CorpusShape(), seed: int = 0, first_id: int = 1
+) -> Iterator[tuple[str, NFM_Event]]:
+    """Yields ``count`` ``(event id, event)`` pairs lazily, so even a million events fit in memory.
+
+    The same seed always gives the same corpus. Events are spread over time from ``shape.start``
+    in id order, like the real calendar.
+    """
+    rng = random.Random(seed)
+    composers = [composer_name(rank) for rank in range(1, shape.composers + 1)]
+    works = {name: composition_names(rank, shape.max_works) for rank, name in enumerate(composers, start=1)}
+    for event_id in range(first_id, first_id + count):
+        programme: dict[str, str] = {}
+        for _ in range(rng.randint(*shape.programme_size)):
+            composer = zipf_pick(rng, composers, shape.zipf_exponent)
+            programme[composer] = zipf_pick(rng, works[composer], shape.zipf_exponent)
+        yield str(event_id), NFM_Event(
+            url=f"https://www.nfm.wroclaw.pl/component/nfmcalendar/event/{event_id}",
+            event_programme=programme,
+            location=zipf_pick(rng, LOCATIONS, shape.zipf_exponent),
+            date=shape.start + timedelta(days=int(event_id / shape.events_per_day)),
+            hour=rng.choice(HOURS),
+        )
+
+
+def populate(
+    db_handler: DatabaseHandler,
+    count: int,
+    shape: CorpusShape = CorpusShape(),
+    seed: int = 0,
+    batch_size: int = 1000,
+) -> SaveStats:
+    """Saves a generated corpus in batches and then builds its read models, the way the scraper does"""
+    total = SaveStats()
+    events = generate_events(count, shape, seed)
+    while batch := dict(itertools.islice(events, batch_size)):
+        stats = db_handler.save_event_data(batch)
+        total.events += stats.events
+        total.composers_created += stats.composers_created
+        total.compositions_created += stats.compositions_created
+        total.links += stats.links
+        total.seconds += stats.seconds
+    db_handler.refresh_read_models()
+    return total
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Fill a database with a synthetic NFM catalogue")
+    arg_parser.add_argument("db_path", help="SQLite file to create or extend, e.g. synthetic.db")
+    arg_parser.add_argument("--events", type=int, default=10_000)
+    arg_parser.add_argument("--composers", type=int, default=CorpusShape.composers)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--batch-size", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    db_handler = DatabaseHandler(f"sqlite:///{args.db_path}")
+    stats = populate(db_handler, args.events, CorpusShape(composers=args.composers), args.seed, args.batch_size)
+    logger.info(
+        f"Saved {stats.events} events, {stats.composers_created} composers, {stats.compositions_created} "
+        f"compositions and {stats.links} links in {time.perf_counter() - started:.1f}s "
+        f"({stats.rows_per_second:.0f} rows/s while saving)"
+    )
+
+
+if __name__ == "__main__":
+    main()